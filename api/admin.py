@@ -1,21 +1,357 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
-from .models import Income, Expense, Liability
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+from .budgets import record_expense
+from .jobs import registered_tasks
+from .models import (
+    Income, Expense, Liability, Employee, SalaryPayment, Customer, CustomerPayment,
+    Budget, RecurringTransaction, Job, ArchivedIncome, ArchivedExpense, LedgerSummary, LedgerClosure,
+    UserProfile, FxRate, BankStatementLine, SalaryAllocation
+)
+
+# Below this many rows an exact COUNT(*) is cheap enough
+ESTIMATE_THRESHOLD = 100000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Uses the planner's row estimate instead of COUNT(*) for unfiltered Postgres changelists."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is not None and not query.where:
+            connection = connections[queryset.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                        [queryset.model._meta.db_table])
+                    row = cursor.fetchone()
+                if row and row[0] >= ESTIMATE_THRESHOLD:
+                    return row[0]
+        return super().count
+
+
+class UserAutocompleteFilter(admin.ListFilter):
+    """Filter by user through the admin's autocomplete endpoint instead of listing every user."""
+    title = 'user'
+    parameter_name = 'user_id'
+    template = 'admin/api/user_autocomplete_filter.html'
+    user_path = 'user'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        value = params.pop(self.parameter_name, None)
+        # Django passes lists of values for each parameter
+        if isinstance(value, list):
+            value = value[-1] if value else None
+        self.value = value
+        if value:
+            self.used_parameters[self.parameter_name] = value
+        self.admin_site = model_admin.admin_site
+
+    def has_output(self):
+        return True
+
+    def expected_parameters(self):
+        return [self.parameter_name]
+
+    def queryset(self, request, queryset):
+        if self.value:
+            return queryset.filter(**{f"{self.user_path}__id": self.value})
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'selected': not self.value,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'All',
+        }
+
+    @property
+    def widget_html(self):
+        field = forms.ModelChoiceField(
+            queryset=User.objects.all(), required=False,
+            widget=AutocompleteSelect(Income._meta.get_field('user'), self.admin_site,
+                                      attrs={'id': 'user-autocomplete-filter', 'style': 'width: 100%'}))
+        return field.widget.render('user_autocomplete', self.value)
+
+
+def user_filter(path):
+    return type('UserAutocompleteFilter', (UserAutocompleteFilter,), {'user_path': path})
+
+
+# A plain field in list_filter lists its values with SELECT DISTINCT over the
+# whole table on every changelist load, so these offer a fixed list instead
+CURRENCY_FILTER_CHOICES = ('LKR', 'USD', 'EUR', 'GBP', 'AUD', 'CAD', 'INR', 'JPY', 'SGD')
+
+
+class FixedChoicesFilter(admin.SimpleListFilter):
+    field = None
+
+    def choices_for(self):
+        return ()
+
+    def lookups(self, request, model_admin):
+        return [(value, value) for value in self.choices_for()]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.field: self.value()})
+        return queryset
+
+
+def fixed_filter(field, choices):
+    return type('FixedChoicesFilter', (FixedChoicesFilter,), {
+        'title': field.replace('_', ' '), 'parameter_name': field, 'field': field,
+        'choices_for': staticmethod(choices)})
+
+
+def currency_filter(field='currency'):
+    return fixed_filter(field, lambda: sorted({settings.DEFAULT_CURRENCY, *CURRENCY_FILTER_CHOICES}))
+
+
+class FinanceAdmin(admin.ModelAdmin):
+    """Changelists that stay fast on large tenants: no full-table counts, no giant selects."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    @property
+    def media(self):
+        autocomplete = AutocompleteSelect(
+            Income._meta.get_field('user'), self.admin_site)
+        return super().media + autocomplete.media
 
 
 @admin.register(Income)
-class IncomeAdmin(admin.ModelAdmin):
-    list_display = ('source', 'amount', 'date', 'user')
-    list_filter = ('date', 'user')
+class IncomeAdmin(FinanceAdmin):
+    list_display = ('source', 'amount', 'currency', 'date', 'user')
+    list_filter = (user_filter('user'), currency_filter(), 'date')
+    list_select_related = ('user',)
+    search_fields = ('source',)
+    date_hierarchy = 'date'
+    autocomplete_fields = ('user',)
+    raw_id_fields = ('recurring_rule', 'reconciled_with')
 
 
 @admin.register(Expense)
-class ExpenseAdmin(admin.ModelAdmin):
-    list_display = ('category', 'amount', 'date', 'user')
-    list_filter = ('category', 'date', 'user')
+class ExpenseAdmin(FinanceAdmin):
+    list_display = ('category', 'amount', 'currency', 'date', 'user')
+    list_filter = (user_filter('user'), 'category', currency_filter(), 'date')
+    list_select_related = ('user',)
+    search_fields = ('description',)
+    date_hierarchy = 'date'
+    autocomplete_fields = ('user',)
+    raw_id_fields = ('recurring_rule', 'reconciled_with', 'customer')
+
+    # Budget counters are only updated on explicit writes, so admin edits
+    # adjust them the same way ExpenseViewSet does
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            if change:
+                old = Expense.objects.get(pk=obj.pk)
+                record_expense(old.user, old.category, old.date, -old.amount, old.currency)
+            super().save_model(request, obj, form, change)
+            record_expense(obj.user, obj.category, obj.date, obj.amount, obj.currency)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            record_expense(obj.user, obj.category, obj.date, -obj.amount, obj.currency)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for expense in queryset:
+                record_expense(expense.user_id, expense.category, expense.date,
+                               -expense.amount, expense.currency)
+            super().delete_queryset(request, queryset)
 
 
 @admin.register(Liability)
-class LiabilityAdmin(admin.ModelAdmin):
+class LiabilityAdmin(FinanceAdmin):
     list_display = ('title', 'total_amount',
-                    'remaining_amount', 'is_settled', 'user')
-    list_filter = ('is_settled', 'user')
+                    'remaining', 'is_settled', 'user')
+    list_filter = (user_filter('user'), 'is_settled')
+    list_select_related = ('user',)
+    search_fields = ('title',)
+    autocomplete_fields = ('user',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _remaining=F('total_amount') - F('paid_amount'))
+
+    @admin.display(description='Remaining', ordering='_remaining')
+    def remaining(self, obj):
+        return obj._remaining
+
+
+@admin.register(Employee)
+class EmployeeAdmin(FinanceAdmin):
+    list_display = ('name', 'role', 'base_salary', 'status', 'user')
+    list_filter = (user_filter('user'), 'status')
+    list_select_related = ('user',)
+    search_fields = ('name', 'role', 'email')
+    autocomplete_fields = ('user',)
+
+
+@admin.register(SalaryPayment)
+class SalaryPaymentAdmin(FinanceAdmin):
+    list_display = ('title', 'employee', 'amount', 'payment_date', 'user')
+    list_filter = (user_filter('employee__user'),)
+    list_select_related = ('employee', 'employee__user')
+    search_fields = ('title', 'employee__name')
+    raw_id_fields = ('employee',)
+
+    @admin.display(ordering='employee__user')
+    def user(self, obj):
+        return obj.employee.user
+
+
+@admin.register(SalaryAllocation)
+class SalaryAllocationAdmin(FinanceAdmin):
+    list_display = ('salary_payment', 'customer', 'amount', 'currency', 'user')
+    list_filter = (user_filter('customer__user'),)
+    list_select_related = ('salary_payment', 'salary_payment__employee', 'customer', 'customer__user')
+    raw_id_fields = ('salary_payment', 'customer')
+
+    @admin.display(ordering='customer__user')
+    def user(self, obj):
+        return obj.customer.user
+
+
+@admin.register(Customer)
+class CustomerAdmin(FinanceAdmin):
+    list_display = ('name', 'project_name', 'currency', 'total_amount', 'paid', 'remaining',
+                    'is_payment_confirmed', 'is_project_delivered', 'user')
+    list_filter = (user_filter('user'), currency_filter(), 'is_payment_confirmed',
+                   'is_project_delivered')
+    list_select_related = ('user',)
+    search_fields = ('name', 'project_name', 'domain_name')
+    autocomplete_fields = ('user',)
+    raw_id_fields = ('advance_income_record',)
+
+    def get_queryset(self, request):
+        money = DecimalField(max_digits=12, decimal_places=2)
+        payments = CustomerPayment.objects.filter(customer=OuterRef('pk')).order_by().values(
+            'customer').annotate(total=Sum('amount')).values('total')
+        paid = F('advance_amount') + Coalesce(Subquery(payments, output_field=money),
+                                              Value(0, output_field=money))
+        return super().get_queryset(request).annotate(_paid=paid, _remaining=F('total_amount') - paid)
+
+    @admin.display(description='Paid', ordering='_paid')
+    def paid(self, obj):
+        return obj._paid
+
+    @admin.display(description='Remaining', ordering='_remaining')
+    def remaining(self, obj):
+        return obj._remaining
+
+
+@admin.register(CustomerPayment)
+class CustomerPaymentAdmin(FinanceAdmin):
+    list_display = ('customer', 'amount', 'currency', 'date', 'note', 'user')
+    list_filter = (user_filter('customer__user'),)
+    list_select_related = ('customer', 'customer__user')
+    search_fields = ('note', 'customer__name', 'customer__project_name')
+    raw_id_fields = ('customer', 'income_record')
+
+    @admin.display(ordering='customer__user')
+    def user(self, obj):
+        return obj.customer.user
+
+
+@admin.register(Budget)
+class BudgetAdmin(FinanceAdmin):
+    list_display = ('category', 'period', 'limit', 'spent',
+                    'utilization', 'period_start', 'user')
+    list_filter = (user_filter('user'), 'period', 'category')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+
+
+@admin.register(RecurringTransaction)
+class RecurringTransactionAdmin(FinanceAdmin):
+    list_display = ('title', 'kind', 'amount', 'rule',
+                    'next_occurrence', 'is_active', 'user')
+    list_filter = (user_filter('user'), 'kind', 'is_active')
+    list_select_related = ('user',)
+    search_fields = ('title',)
+    autocomplete_fields = ('user',)
+
+
+@admin.register(Job)
+class JobAdmin(FinanceAdmin):
+    list_display = ('kind', 'status', 'progress',
+                    'attempts', 'created_at', 'finished_at', 'user')
+    list_filter = ('status', fixed_filter('kind', lambda: sorted(registered_tasks())), user_filter('user'))
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+
+
+@admin.register(ArchivedIncome)
+class ArchivedIncomeAdmin(FinanceAdmin):
+    # The archive has no date/user indexes, so no date hierarchy here
+    list_display = ('source', 'amount', 'date', 'user')
+    list_filter = (user_filter('user'),)
+    list_select_related = ('user',)
+    raw_id_fields = ('user', 'recurring_rule', 'reconciled_with')
+
+
+@admin.register(ArchivedExpense)
+class ArchivedExpenseAdmin(FinanceAdmin):
+    list_display = ('category', 'amount', 'date', 'user')
+    list_filter = (user_filter('user'),)
+    list_select_related = ('user',)
+    raw_id_fields = ('user', 'recurring_rule', 'reconciled_with', 'customer')
+
+
+@admin.register(LedgerSummary)
+class LedgerSummaryAdmin(FinanceAdmin):
+    list_display = ('kind', 'date', 'category',
+                    'currency', 'total', 'count', 'user')
+    list_filter = (user_filter('user'), 'kind')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(LedgerClosure)
+class LedgerClosureAdmin(FinanceAdmin):
+    list_display = ('user', 'closed_through', 'closed_at')
+    list_filter = (user_filter('user'),)
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(UserProfile)
+class UserProfileAdmin(FinanceAdmin):
+    list_display = ('user', 'base_currency')
+    list_filter = (user_filter('user'), currency_filter('base_currency'))
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+
+
+@admin.register(FxRate)
+class FxRateAdmin(FinanceAdmin):
+    list_display = ('base', 'quote', 'date', 'rate')
+    list_filter = (currency_filter('base'), currency_filter('quote'))
+    date_hierarchy = 'date'
+
+
+@admin.register(BankStatementLine)
+class BankStatementLineAdmin(FinanceAdmin):
+    list_display = ('date', 'amount', 'currency', 'description', 'reference', 'user')
+    list_filter = (user_filter('user'), currency_filter(), 'date')
+    list_select_related = ('user',)
+    search_fields = ('description', 'reference')
+    date_hierarchy = 'date'
+    autocomplete_fields = ('user',)
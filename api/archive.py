@@ -0,0 +1,166 @@
+import datetime
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from rest_framework.exceptions import ValidationError
+from .models import (
+    Income, Expense, ArchivedIncome, ArchivedExpense, LedgerSummary, LedgerClosure
+)
+from .currency import converted_amount, round_money
+
+ARCHIVE_CHUNK_SIZE = 5000
+
+
+def fiscal_year_end(year):
+    """Last day of the fiscal year starting in `year` (FISCAL_YEAR_START_MONTH, default January)."""
+    start_month = getattr(settings, 'FISCAL_YEAR_START_MONTH', 1)
+    if start_month == 1:
+        return datetime.date(year, 12, 31)
+    return datetime.date(year + 1, start_month, 1) - datetime.timedelta(days=1)
+
+
+def closed_through(user):
+    return LedgerClosure.objects.filter(user=user).values_list('closed_through', flat=True).first()
+
+
+def _summarise(user, kind, queryset, by_category):
+    group_by = ['date', 'currency'] + (['category'] if by_category else [])
+    groups = queryset.values(*group_by).annotate(total=Sum('amount'), count=Count('id')).order_by()
+
+    # Only re-closing a year after late entries touches existing days
+    existing = set(LedgerSummary.objects.filter(user=user, kind=kind).filter(
+        date__in=queryset.values('date')).values_list('date', 'category', 'currency'))
+    new = []
+    for group in groups:
+        key = dict(user=user, kind=kind, date=group['date'],
+                   category=group.get('category', ''), currency=group['currency'])
+        if (key['date'], key['category'], key['currency']) in existing:
+            LedgerSummary.objects.filter(**key).update(
+                total=F('total') + group['total'], count=F('count') + group['count'])
+        else:
+            new.append(LedgerSummary(year=key['date'].year, month=key['date'].month,
+                                     total=group['total'], count=group['count'], **key))
+    LedgerSummary.objects.bulk_create(new, batch_size=ARCHIVE_CHUNK_SIZE)
+
+
+def _move(queryset, archive_model, chunk_size):
+    fields = [f.attname for f in queryset.model._meta.concrete_fields]
+    moved = 0
+    while True:
+        rows = list(queryset.order_by('id').values_list(*fields)[:chunk_size])
+        if not rows:
+            return moved
+        archive_model.objects.bulk_create(
+            [archive_model(**dict(zip(fields, row))) for row in rows])
+        queryset.model.objects.filter(id__in=[row[0] for row in rows]).delete()
+        moved += len(rows)
+
+
+def close_year(user, year, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+    Move `user`'s transactions dated on or before the end of fiscal `year` into
+    the archive tables, leaving LedgerSummary rows so totals stay exact.
+    Incomes linked to a customer advance/payment stay in the hot table.
+    """
+    cutoff = fiscal_year_end(year)
+    if cutoff >= datetime.date.today():
+        raise ValueError("Only fiscal years that have ended can be closed")
+
+    incomes = Income.objects.filter(user=user, date__lte=cutoff).filter(
+        customer_advance__isnull=True, customer_payment__isnull=True)
+    expenses = Expense.objects.filter(user=user, date__lte=cutoff)
+
+    with transaction.atomic():
+        _summarise(user, 'income', incomes, by_category=False)
+        _summarise(user, 'expense', expenses, by_category=True)
+        moved_incomes = _move(incomes, ArchivedIncome, chunk_size)
+        moved_expenses = _move(expenses, ArchivedExpense, chunk_size)
+
+        previous = closed_through(user)
+        LedgerClosure.objects.update_or_create(
+            user=user, defaults={'closed_through': max(filter(None, [previous, cutoff]))})
+
+    return {'closed_through': cutoff.isoformat(), 'incomes': moved_incomes, 'expenses': moved_expenses}
+
+
+def rebuild_summaries(user):
+    """Recompute `user`'s LedgerSummary rows from the archive tables."""
+    LedgerSummary.objects.filter(user=user).delete()
+    _summarise(user, 'income', ArchivedIncome.objects.filter(user=user), by_category=False)
+    _summarise(user, 'expense', ArchivedExpense.objects.filter(user=user), by_category=True)
+
+
+# --- Reading archived totals ---
+
+
+def _converted_totals(summaries, key, to_currency):
+    """
+    {key: (total, skipped)} for summary rows grouped by the `key` fields,
+    converted into `to_currency` in SQL at each day's rate, the way the hot
+    rows are. `skipped` counts the transactions left out for lack of a rate.
+    """
+    converted = converted_amount(to_currency, amount='total')
+    rows = summaries.annotate(converted=converted).values(*key).annotate(
+        total=Sum('converted'), skipped=Sum('count', filter=Q(converted__isnull=True))).order_by()
+    return {tuple(row[k] for k in key): (round_money(row['total']), row['skipped'] or 0)
+            for row in rows}
+
+
+def archived_total(user, kind, to_currency):
+    """(total in `to_currency`, number of archived transactions with no rate)."""
+    totals = _converted_totals(LedgerSummary.objects.filter(user=user, kind=kind), ['kind'], to_currency)
+    return totals.get((kind,), (Decimal(0), 0))
+
+
+def archived_category_totals(user, to_currency):
+    totals = _converted_totals(
+        LedgerSummary.objects.filter(user=user, kind='expense'), ['category'], to_currency)
+    return {category: total for (category,), (total, _) in totals.items()}
+
+
+def archived_monthly_totals(user, since, to_currency):
+    """{(kind, year, month): total} for archived months on or after `since`."""
+    totals = _converted_totals(
+        LedgerSummary.objects.filter(user=user, date__gte=since.replace(day=1)),
+        ['kind', 'year', 'month'], to_currency)
+    return {key: total for key, (total, _) in totals.items()}
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.date.fromisoformat(value) if value else None
+    except ValueError:
+        raise ValidationError({name: 'Use YYYY-MM-DD.'})
+
+
+class ArchiveUnionMixin:
+    """
+    Adds ?start_date=&end_date= to `list`. When the range reaches into a closed
+    fiscal year the hot table is UNIONed with `archive_model`; a range with
+    only an end date is open towards the past, so it always does. The
+    unfiltered list stays on the hot table.
+    """
+    archive_model = None
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if getattr(self, 'action', None) != 'list':
+            return queryset
+
+        start = _parse_date(self.request.query_params.get('start_date'), 'start_date')
+        end = _parse_date(self.request.query_params.get('end_date'), 'end_date')
+        date_filter = {}
+        if start:
+            date_filter['date__gte'] = start
+        if end:
+            date_filter['date__lte'] = end
+        queryset = queryset.filter(**date_filter)
+
+        closed = closed_through(self.request.user) if date_filter else None
+        if closed is None or (start and start > closed):
+            return queryset
+
+        archived = self.archive_model.objects.filter(
+            user=self.request.user, **date_filter)
+        return queryset.order_by().union(archived, all=True).order_by('-date')
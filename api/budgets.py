@@ -0,0 +1,94 @@
+import datetime
+from decimal import Decimal
+from django.db.models import F, Q, Sum
+from .models import Budget, Expense
+from .currency import base_currency, convert, converted_amount
+
+
+def _as_date(value):
+    # Expense.objects.create() keeps whatever was passed in, which may be the raw request string
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    return value
+
+
+def period_bounds(period, day):
+    """Return the (start, end) dates, inclusive, of the budget period containing `day`."""
+    day = _as_date(day)
+    if period == 'Weekly':
+        start = day - datetime.timedelta(days=day.weekday())
+        return start, start + datetime.timedelta(days=6)
+    if period == 'Yearly':
+        return day.replace(month=1, day=1), day.replace(month=12, day=31)
+    start = day.replace(day=1)
+    next_month = (start + datetime.timedelta(days=32)).replace(day=1)
+    return start, next_month - datetime.timedelta(days=1)
+
+
+def record_expense(user, category, date, amount, currency=None):
+    """
+    Add `amount` (negative to reverse) to every budget of `user` that tracks
+    `category` in the period containing `date`. One UPDATE, no Expense reads.
+    Budgets are kept in the user's base currency; pass `currency` when the
+    expense may be in another one.
+    """
+    amount = Decimal(str(amount))
+    if currency is not None and amount:
+        amount = convert(amount, currency, base_currency(user), _as_date(date))
+    if not amount:
+        return 0
+
+    periods = Q()
+    for period, _ in Budget.PERIOD_CHOICES:
+        periods |= Q(period=period, period_start=period_bounds(period, date)[0])
+
+    return Budget.objects.filter(periods, user=user, category=category).update(
+        spent=F('spent') + amount)
+
+
+def reset_budget(budget, today=None):
+    """
+    Point `budget` at the period containing `today` and seed its counter.
+
+    This is the only place that aggregates Expense: once when a budget is
+    created or edited, and once per budget when its period rolls over.
+    """
+    start, end = period_bounds(budget.period, today or datetime.date.today())
+    budget.period_start = start
+    budget.spent = (Expense.objects.filter(
+        user=budget.user, category=budget.category, date__range=(start, end)
+    ).aggregate(total=Sum(converted_amount(base_currency(budget.user))))['total'] or Decimal(0)).quantize(Decimal('0.01'))
+    budget.save(update_fields=['period_start', 'spent'])
+    return budget
+
+
+def roll_over(budgets, today=None):
+    """Reset any budgets whose stored period has ended."""
+    today = today or datetime.date.today()
+    for budget in budgets:
+        if budget.period_start != period_bounds(budget.period, today)[0]:
+            reset_budget(budget, today)
+    return budgets
+
+
+def budget_alerts(budgets):
+    alerts = []
+    for budget in budgets:
+        if budget.spent > budget.limit:
+            level = 'breached'
+        elif budget.utilization >= budget.alert_threshold:
+            level = 'warning'
+        else:
+            continue
+        alerts.append({
+            'budget': budget.id,
+            'category': budget.category,
+            'period': budget.period,
+            'level': level,
+            'spent': budget.spent,
+            'limit': budget.limit,
+            'utilization': budget.utilization,
+        })
+    return alerts
@@ -0,0 +1,88 @@
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce
+from .models import FxRate, UserProfile
+
+# Wide enough for amount * rate before Sum() rounds it back to cents
+CONVERTED_FIELD = DecimalField(max_digits=28, decimal_places=8)
+
+# Memoized rates for write paths: {(base, quote, date): (rate, expires)}
+RATE_CACHE_SECONDS = 300
+RATE_CACHE_SIZE = 4096
+_rate_cache = {}
+
+
+def base_currency(user):
+    return UserProfile.objects.filter(user=user).values_list(
+        'base_currency', flat=True).first() or settings.DEFAULT_CURRENCY
+
+
+def _lookup(base, quote, date):
+    rates = FxRate.objects.filter(base=base, quote=quote)
+    return (rates.filter(date__lte=date).order_by('-date').values_list('rate', flat=True).first()
+            or rates.filter(date__gt=date).order_by('date').values_list('rate', flat=True).first())
+
+
+def rate(base, quote, date):
+    """
+    Units of `quote` per `base` on `date`: the latest rate on or before it,
+    else the earliest one after it, else None. Found rates are memoized per
+    process for RATE_CACHE_SECONDS, so rates loaded by another process are
+    picked up within that time; misses are never cached.
+    """
+    if base == quote:
+        return Decimal(1)
+    key = (base, quote, date)
+    now = time.monotonic()
+    hit = _rate_cache.get(key)
+    if hit is not None and hit[1] > now:
+        return hit[0]
+    value = _lookup(base, quote, date)
+    if value is not None:
+        if len(_rate_cache) >= RATE_CACHE_SIZE:
+            _rate_cache.clear()
+        _rate_cache[key] = (value, now + RATE_CACHE_SECONDS)
+    return value
+
+
+def clear_rate_cache():
+    _rate_cache.clear()
+
+
+def convert(amount, currency, to_currency, date):
+    """`amount` in `to_currency`, or None when no rate is loaded for the pair."""
+    fx = rate(currency, to_currency, date)
+    return None if fx is None else Decimal(amount) * fx
+
+
+def _rate_subquery(to_currency, currency, date, before):
+    # An OuterRef target is one level further out from inside this subquery
+    quote = OuterRef(to_currency) if isinstance(to_currency, OuterRef) else to_currency
+    rates = FxRate.objects.filter(base=OuterRef(currency), quote=quote)
+    if before:
+        rates = rates.filter(date__lte=OuterRef(date)).order_by('-date')
+    else:
+        rates = rates.filter(date__gt=OuterRef(date)).order_by('date')
+    return Subquery(rates.values('rate')[:1])
+
+
+def converted_amount(to_currency, amount='amount', currency='currency', date='date'):
+    """
+    SQL expression for `amount` in `to_currency` (a code, or an OuterRef to the
+    enclosing query's currency column), for use inside Sum(). The rate
+    lookups are correlated subqueries on the unique_fx_rate index, matching
+    rate(); rows with no rate for their pair come out NULL and drop out of the sum.
+    """
+    fx = Coalesce(_rate_subquery(to_currency, currency, date, before=True),
+                  _rate_subquery(to_currency, currency, date, before=False))
+    return Case(
+        When(**{currency: to_currency}, then=F(amount)),
+        default=ExpressionWrapper(F(amount) * fx, output_field=CONVERTED_FIELD),
+        output_field=CONVERTED_FIELD,
+    )
+
+
+def round_money(value):
+    return (value or Decimal(0)).quantize(Decimal('0.01'))
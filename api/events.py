@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Events queued per connection before it is considered too slow and told to resync
+QUEUE_SIZE = 100
+
+
+class InProcessBroker:
+    """
+    Fans events out to the SSE connections open in this process. Publishers
+    may run in any thread; each subscriber is an asyncio.Queue on its loop.
+
+    Other backends (e.g. Redis or Postgres LISTEN/NOTIFY) only need the same
+    subscribe/unsubscribe/publish/has_subscribers methods and can be selected
+    with the LIVE_EVENTS_BROKER setting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            self._subscribers[user_id].discard(subscriber)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def has_subscribers(self, user_id):
+        return user_id in self._subscribers
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, event)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Crosses processes with LISTEN/NOTIFY, so the WSGI API workers can reach
+    streams held by the separate events process. Publishers NOTIFY; each
+    process with open streams LISTENs on one thread and fans out locally.
+    """
+    CHANNEL = 'live_events'
+    # NOTIFY payloads are capped at 8000 bytes
+    MAX_PAYLOAD = 7900
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, daemon=True)
+                self._listener.start()
+        return super().subscribe(user_id)
+
+    def has_subscribers(self, user_id):
+        # Streams live in another process, so this one can't tell
+        return True
+
+    def publish(self, user_id, event):
+        payload = json.dumps({'user': user_id, 'event': event}, cls=DjangoJSONEncoder)
+        if len(payload) > self.MAX_PAYLOAD:
+            payload = json.dumps({'user': user_id, 'event': {'type': 'resync', 'data': {}}})
+        try:
+            with connections['default'].cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", [self.CHANNEL, payload])
+        except DatabaseError:
+            # Live events are best effort; never fail the write that caused them
+            logger.exception("Could not publish a live event")
+
+    def _listen(self):
+        import psycopg2
+
+        while True:
+            try:
+                conn = psycopg2.connect(**connections['default'].get_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.CHANNEL}")
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        message = json.loads(conn.notifies.pop(0).payload)
+                        super().publish(message['user'], message['event'])
+            except psycopg2.Error:
+                logger.exception("Live event listener lost its connection, reconnecting")
+                threading.Event().wait(5)
+
+
+def _offer(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # The client fell behind: drop the backlog and ask it to refetch
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({'type': 'resync', 'data': {}})
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        path = getattr(settings, 'LIVE_EVENTS_BROKER',
+                       'api.events.InProcessBroker')
+        _broker = import_string(path)()
+    return _broker
+
+
+# --- Publishing helpers (called from signals and bulk write paths) ---
+
+def publish(user_id, event_type, data):
+    """Send an event to the user's open dashboards once the transaction commits."""
+    broker = get_broker()
+    if not broker.has_subscribers(user_id):
+        return
+    transaction.on_commit(lambda: broker.publish(
+        user_id, {'type': event_type, 'data': data}))
+
+
+def publish_totals(user_id):
+    """
+    Queue one 'totals' event per user per transaction, however many rows
+    changed. It carries no figures: the stream computes them when it sends
+    the event, so writes don't pay for totals nobody may be watching.
+    """
+    if not get_broker().has_subscribers(user_id):
+        return
+    # Look for a send already queued on this connection: a rollback removes it
+    # along with every other on_commit callback, so nothing can go stale
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and any(
+            getattr(entry[1], 'totals_user', None) == user_id for entry in connection.run_on_commit):
+        return
+
+    def send():
+        get_broker().publish(user_id, {'type': 'totals', 'data': None})
+    send.totals_user = user_id
+    transaction.on_commit(send)
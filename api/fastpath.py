@@ -0,0 +1,143 @@
+import decimal
+from json.encoder import encode_basestring
+from django.db import models
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Output for every converter below matches what DRF's own fields render,
+# so list responses are byte-for-byte compatible with the serializer path.
+
+
+def _encode_int(value):
+    return str(value)
+
+
+def _encode_bool(value):
+    return 'true' if value else 'false'
+
+
+def _encode_date(value):
+    return f'"{value.isoformat()}"'
+
+
+def _datetime_encoder():
+    # Resolve the active timezone once, not per row
+    tz = timezone.get_current_timezone()
+
+    def encode(value):
+        if value.tzinfo is not None:
+            value = value.astimezone(tz)
+        text = value.isoformat()
+        if text.endswith('+00:00'):
+            text = text[:-6] + 'Z'
+        return f'"{text}"'
+    return encode
+
+
+def _decimal_encoder(decimal_places):
+    quantum = decimal.Decimal(1).scaleb(-decimal_places)
+
+    def encode(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value))
+        return f'"{value.quantize(quantum):f}"'
+    return encode
+
+
+def _nullable(encode):
+    def encode_or_null(value):
+        return 'null' if value is None else encode(value)
+    return encode_or_null
+
+
+def _field_encoder(model_field):
+    if isinstance(model_field, models.ForeignKey):
+        return _field_encoder(model_field.target_field)
+    if isinstance(model_field, models.DecimalField):
+        return _decimal_encoder(model_field.decimal_places)
+    if isinstance(model_field, models.BooleanField):
+        return _encode_bool
+    if isinstance(model_field, models.DateTimeField):
+        return _datetime_encoder()
+    if isinstance(model_field, models.DateField):
+        return _encode_date
+    if isinstance(model_field, (models.AutoField, models.IntegerField)):
+        return _encode_int
+    if isinstance(model_field, (models.CharField, models.TextField)):
+        return encode_basestring
+    return None
+
+
+class RowEncoder:
+    """
+    Turns `.values_list()` tuples into JSON objects using a format string and
+    one converter per column, compiled once from the serializer's fields.
+    """
+
+    def __init__(self, model, columns):
+        # columns: [(json key, model field)]
+        self.model = model
+        self.keys = [key for key, _ in columns]
+        self.attnames = [field.attname for _, field in columns]
+        self.encoders = [_nullable(_field_encoder(field)) for _, field in columns]
+        self.template = '{' + ','.join(
+            encode_basestring(key).replace('%', '%%') + ':%s' for key in self.keys) + '}'
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """Return an encoder, or None if any field needs the full serializer."""
+        model = serializer.Meta.model
+        columns = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if not isinstance(field, (serializers.ModelField, serializers.ReadOnlyField,
+                                      serializers.PrimaryKeyRelatedField, serializers.CharField,
+                                      serializers.IntegerField, serializers.DecimalField,
+                                      serializers.DateField, serializers.DateTimeField,
+                                      serializers.BooleanField, serializers.ChoiceField)):
+                return None
+            try:
+                model_field = model._meta.get_field(field.source)
+            except Exception:
+                return None
+            if not model_field.concrete or _field_encoder(model_field) is None:
+                return None
+            columns.append((name, model_field))
+        return cls(model, columns)
+
+    def encode_row(self, row):
+        return self.template % tuple([encode(value) for encode, value in zip(self.encoders, row)])
+
+    def encode_queryset(self, queryset, chunk_size=2000):
+        rows = queryset.values_list(*self.attnames).iterator(chunk_size=chunk_size)
+        encode_row = self.encode_row
+        body = '[' + ','.join([encode_row(row) for row in rows]) + ']'
+        # Like JSONRenderer: these are valid JSON but end a line in JavaScript
+        body = body.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return PreEncodedJSON(body.encode('utf-8'))
+
+
+class PreEncodedJSON(bytes):
+    """Response data that is already JSON; FastJSONRenderer passes it through."""
+
+
+class FastListMixin:
+    """
+    Read-only fast path for `list`: skips per-row serializer instances and
+    renders straight from `.values_list()`. Falls back to the normal path for
+    the browsable API or serializers with computed fields.
+    """
+
+    def list(self, request, *args, **kwargs):
+        renderer = getattr(request, 'accepted_renderer', None)
+        if getattr(renderer, 'format', None) != 'json' or self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+
+        encoder = RowEncoder.for_serializer(self.get_serializer())
+        if encoder is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(encoder.encode_queryset(queryset))
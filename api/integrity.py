@@ -0,0 +1,200 @@
+import time
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import F, Max, Min, Q
+from .models import Income, Customer, CustomerPayment
+
+CHUNK_SIZE = 10000
+
+# Sources written by CustomerViewSet / CustomerPaymentViewSet
+ADVANCE_PREFIX = "Project Advance: "
+PAYMENT_PREFIX = "Project Payment: "
+
+
+def _advance_income(user_id, project_name, name, amount, currency, day):
+    return Income(user_id=user_id, source=f"{ADVANCE_PREFIX}{project_name}", amount=amount,
+                  currency=currency, date=day, description=f"Initial Advance Payment for {name}")
+
+
+def _payment_income(user_id, project_name, name, amount, currency, day, note):
+    return Income(user_id=user_id, source=f"{PAYMENT_PREFIX}{project_name}", amount=amount,
+                  currency=currency, date=day, description=f"Partial Payment ({note}) for {name}")
+
+
+# --- Repairs: each receives the value rows found in one chunk ---
+
+
+def _repair_missing_advance(rows):
+    incomes = Income.objects.bulk_create([
+        _advance_income(user_id, project, name, amount, currency, created_at.date())
+        for _, user_id, project, name, amount, currency, created_at in rows])
+    Customer.objects.bulk_update([
+        Customer(id=row[0], advance_income_record_id=income.id)
+        for row, income in zip(rows, incomes)], ['advance_income_record'])
+
+
+def _repair_advance_mismatch(rows):
+    # The customer record is the source of truth for the advance
+    cleared = [income_id for _, income_id, amount, _ in rows if not amount]
+    Income.objects.filter(id__in=cleared).delete()
+    Income.objects.bulk_update([
+        Income(id=income_id, amount=amount, currency=currency)
+        for _, income_id, amount, currency in rows if amount], ['amount', 'currency'])
+
+
+def _repair_missing_payment_income(rows):
+    incomes = Income.objects.bulk_create([
+        _payment_income(user_id, project, name, amount, currency, day, note)
+        for _, user_id, project, name, amount, currency, day, note in rows])
+    CustomerPayment.objects.bulk_update([
+        CustomerPayment(id=row[0], income_record_id=income.id)
+        for row, income in zip(rows, incomes)], ['income_record'])
+
+
+def _repair_payment_mismatch(rows):
+    Income.objects.bulk_update([
+        Income(id=income_id, amount=amount, currency=currency, date=day)
+        for _, income_id, amount, currency, day in rows], ['amount', 'currency', 'date'])
+
+
+def _repair_orphans(rows):
+    Income.objects.filter(id__in=[row[0] for row in rows]).delete()
+
+
+def _written_for_customer(rows):
+    """
+    Whether each unlinked row has the exact source and description that
+    CustomerViewSet/CustomerPaymentViewSet write for one of its user's
+    customers, as opposed to a hand-typed income that shares the prefix.
+    """
+    names = defaultdict(set)
+    for user_id, project, name in Customer.objects.filter(
+            user_id__in={row[1] for row in rows}).values_list('user_id', 'project_name', 'name'):
+        names[(user_id, ADVANCE_PREFIX + project)].add(name)
+        names[(user_id, PAYMENT_PREFIX + project)].add(name)
+
+    def written(row):
+        _, user_id, source, description = row[:4]
+        description = description or ''
+        for name in names.get((user_id, source), ()):
+            if source.startswith(ADVANCE_PREFIX) and description == f"Initial Advance Payment for {name}":
+                return True
+            if (source.startswith(PAYMENT_PREFIX) and description.startswith("Partial Payment (")
+                    and description.endswith(f") for {name}")):
+                return True
+        return False
+    return written
+
+
+def _generated_orphans(rows):
+    written = _written_for_customer(rows)
+    return [row for row in rows if written(row)]
+
+
+def _other_orphans(rows):
+    written = _written_for_customer(rows)
+    return [row for row in rows if not written(row)]
+
+
+UNLINKED_PROJECT_INCOME = (Q(source__startswith=ADVANCE_PREFIX) | Q(source__startswith=PAYMENT_PREFIX)) \
+    & Q(customer_advance__isnull=True, customer_payment__isnull=True)
+
+# Each check is an anti-join that only returns broken rows, applied one
+# primary-key range at a time so memory stays bounded by the chunk size.
+# `select` narrows a chunk's rows further in Python. A check marked
+# `explicit` is only repaired when named with --check.
+CHECKS = [
+    {
+        'name': 'missing_advance_income',
+        'model': Customer,
+        'filter': Q(advance_amount__gt=0, advance_income_record__isnull=True),
+        'columns': ('id', 'user_id', 'project_name', 'name', 'advance_amount', 'currency', 'created_at'),
+        'repair': _repair_missing_advance,
+    },
+    {
+        'name': 'advance_amount_mismatch',
+        'model': Customer,
+        'filter': Q(advance_income_record__isnull=False) & (
+            ~Q(advance_income_record__amount=F('advance_amount'))
+            | ~Q(advance_income_record__currency=F('currency'))),
+        'columns': ('id', 'advance_income_record_id', 'advance_amount', 'currency'),
+        'repair': _repair_advance_mismatch,
+    },
+    {
+        'name': 'missing_payment_income',
+        'model': CustomerPayment,
+        'filter': Q(income_record__isnull=True),
+        'columns': ('id', 'customer__user_id', 'customer__project_name', 'customer__name',
+                    'amount', 'currency', 'date', 'note'),
+        'repair': _repair_missing_payment_income,
+    },
+    {
+        'name': 'payment_amount_mismatch',
+        'model': CustomerPayment,
+        'filter': Q(income_record__isnull=False) & (
+            ~Q(income_record__amount=F('amount')) | ~Q(income_record__currency=F('currency'))
+            | ~Q(income_record__date=F('date'))),
+        'columns': ('id', 'income_record_id', 'amount', 'currency', 'date'),
+        'repair': _repair_payment_mismatch,
+    },
+    {
+        'name': 'orphaned_income',
+        'model': Income,
+        'filter': UNLINKED_PROJECT_INCOME,
+        'columns': ('id', 'user_id', 'source', 'description', 'amount'),
+        'select': _generated_orphans,
+        'repair': _repair_orphans,
+    },
+    {
+        # Same prefix but not written for a current customer: it may have been
+        # typed by hand, or its customer deleted outside the API
+        'name': 'unlinked_project_income',
+        'model': Income,
+        'filter': UNLINKED_PROJECT_INCOME,
+        'columns': ('id', 'user_id', 'source', 'description', 'amount'),
+        'select': _other_orphans,
+        'repair': _repair_orphans,
+        'explicit': True,
+    },
+]
+
+USER_FIELD = {Customer: 'user', CustomerPayment: 'customer__user', Income: 'user'}
+
+
+def run_check(check, repair=False, user=None, chunk_size=CHUNK_SIZE, on_issue=None):
+    """
+    Scan the check's table in primary-key chunks. Returns stats for the check;
+    `on_issue(row)` is called for every broken row found.
+    """
+    model = check['model']
+    base = model.objects.all()
+    if user is not None:
+        base = base.filter(**{USER_FIELD[model]: user})
+
+    bounds = base.aggregate(low=Min('id'), high=Max('id'))
+    stats = {'check': check['name'], 'scanned': 0, 'issues': 0, 'repaired': 0}
+    started = time.perf_counter()
+
+    if bounds['low'] is not None:
+        for low in range(bounds['low'], bounds['high'] + 1, chunk_size):
+            chunk = base.filter(id__gte=low, id__lt=low + chunk_size)
+            stats['scanned'] += chunk.count()
+            rows = list(chunk.filter(check['filter']).order_by(
+                'id').values_list(*check['columns']))
+            if rows and 'select' in check:
+                rows = check['select'](rows)
+            if not rows:
+                continue
+            stats['issues'] += len(rows)
+            if on_issue:
+                for row in rows:
+                    on_issue(row)
+            if repair:
+                with transaction.atomic():
+                    check['repair'](rows)
+                stats['repaired'] += len(rows)
+
+    elapsed = time.perf_counter() - started
+    stats['seconds'] = round(elapsed, 3)
+    stats['rows_per_second'] = int(stats['scanned'] / elapsed) if elapsed else 0
+    return stats
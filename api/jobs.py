@@ -0,0 +1,155 @@
+import contextlib
+import datetime
+import inspect
+import threading
+import traceback
+from django.db import DatabaseError, connection
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+
+# A running job whose lock has not been renewed within this window is
+# assumed dead and handed to another worker. Live workers renew it on every
+# heartbeat, however long the job runs.
+STALE_AFTER = datetime.timedelta(minutes=30)
+HEARTBEAT_SECONDS = 60
+
+_TASKS = {}
+
+
+def task(name):
+    """Register a function as a background task: fn(job, **payload) -> JSON-able result."""
+    def register(fn):
+        _TASKS[name] = fn
+        return fn
+    return register
+
+
+def registered_tasks():
+    from . import tasks  # noqa: F401  (importing registers the tasks)
+    return _TASKS
+
+
+def check_payload(kind, payload):
+    """
+    Raise ValueError unless `payload` fits the keyword arguments of task
+    `kind`; arguments annotated `int` must also parse as integers.
+    """
+    fn = registered_tasks().get(kind)
+    if fn is None:
+        raise ValueError(f"Unknown task: {kind}")
+    if not isinstance(payload, dict):
+        raise ValueError("Payload must be an object")
+    signature = inspect.signature(fn)
+    try:
+        bound = signature.bind(None, **payload)
+    except TypeError as exc:
+        raise ValueError(f"Invalid payload for {kind}: {exc}")
+    for name, value in bound.arguments.items():
+        if signature.parameters[name].annotation is int:
+            try:
+                int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid payload for {kind}: {name} must be an integer")
+
+
+def enqueue(user, kind, payload=None, max_attempts=3):
+    payload = payload or {}
+    check_payload(kind, payload)
+    return Job.objects.create(user=user, kind=kind, payload=payload, max_attempts=max_attempts)
+
+
+def set_progress(job, percent):
+    job.progress = max(0, min(100, int(percent)))
+    Job.objects.filter(pk=job.pk).update(progress=job.progress, locked_at=timezone.now())
+
+
+@contextlib.contextmanager
+def heartbeat(job, interval=HEARTBEAT_SECONDS):
+    """Keep renewing `job`'s lock from a side thread while the body runs."""
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(interval):
+                try:
+                    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+                        locked_at=timezone.now())
+                except DatabaseError:
+                    # e.g. SQLite busy behind the job's own transaction; try next beat
+                    pass
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def requeue_stale(now=None):
+    """
+    Hand jobs of dead workers back to the queue, or fail them once they have
+    used up their attempts (a job that keeps killing its worker).
+    """
+    now = now or timezone.now()
+    stale = Job.objects.filter(status='running', locked_at__lt=now - STALE_AFTER)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=now, locked_by=None, locked_at=None,
+        error="The worker running this job stopped responding")
+    return stale.update(status='queued', locked_by=None, locked_at=None)
+
+
+def claim_next(worker_id):
+    """
+    Claim the oldest ready job. The conditional UPDATE only succeeds for one
+    worker, so this works on SQLite and Postgres without row locks or a broker.
+    """
+    while True:
+        now = timezone.now()
+        candidate = Job.objects.filter(status='queued', run_after__lte=now).order_by(
+            'run_after', 'id').values_list('id', flat=True).first()
+        if candidate is None:
+            return None
+        claimed = Job.objects.filter(pk=candidate, status='queued').update(
+            status='running', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1)
+        if claimed:
+            return Job.objects.get(pk=candidate)
+        # Another worker won the race, try the next one
+
+
+def run_job(job):
+    """
+    Run a claimed job. Failures are retried with backoff, except ValueError
+    (a bad payload or a request the task rejects), which no retry can fix.
+    """
+    try:
+        check_payload(job.kind, job.payload)
+        with heartbeat(job):
+            result = registered_tasks()[job.kind](job, **job.payload)
+    except Exception as exc:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts and not isinstance(exc, ValueError):
+            # Exponential backoff: 2, 4, 8... seconds
+            job.status = 'queued'
+            job.run_after = timezone.now() + datetime.timedelta(seconds=2 ** job.attempts)
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+        job.locked_by = None
+        job.locked_at = None
+        job.save(update_fields=['status', 'error', 'run_after',
+                 'finished_at', 'locked_by', 'locked_at'])
+        return job
+
+    job.status = 'succeeded'
+    job.progress = 100
+    job.result = result
+    job.error = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress',
+             'result', 'error', 'finished_at'])
+    return job
@@ -0,0 +1,58 @@
+import datetime
+import json
+import time
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from api.fastpath import RowEncoder
+from api.models import Income, Expense
+from api.serializers import IncomeSerializer, ExpenseSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare the serializer list path with the values() fast path on synthetic data (rolled back afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+
+    def _seed(self, user, rows):
+        start = datetime.date(2020, 1, 1)
+        Income.objects.bulk_create([
+            Income(user=user, source=f"Client {i % 97}", amount=Decimal(i % 5000) + Decimal('0.25'),
+                   date=start + datetime.timedelta(days=i % 2000), description="Benchmark row")
+            for i in range(rows)
+        ], batch_size=2000)
+        Expense.objects.bulk_create([
+            Expense(user=user, category='Food', amount=Decimal(i % 700) + Decimal('0.10'),
+                    date=start + datetime.timedelta(days=i % 2000), description=None)
+            for i in range(rows)
+        ], batch_size=2000)
+
+    def _time(self, fn):
+        started = time.perf_counter()
+        body = fn()
+        return time.perf_counter() - started, body
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            with transaction.atomic():
+                user = User.objects.create_user(f"bench-{time.time_ns()}")
+                self._seed(user, rows)
+
+                for model, serializer_class in ((Income, IncomeSerializer), (Expense, ExpenseSerializer)):
+                    queryset = model.objects.filter(user=user).order_by('-date')
+
+                    slow, slow_body = self._time(lambda: JSONRenderer().render(
+                        serializer_class(queryset, many=True).data))
+                    encoder = RowEncoder.for_serializer(serializer_class())
+                    fast, fast_body = self._time(
+                        lambda: bytes(encoder.encode_queryset(queryset)))
+
+                    same = json.loads(slow_body) == json.loads(fast_body)
+                    self.stdout.write(
+                        f"{model.__name__:8} {rows:>7} rows  serializer {slow:7.3f}s  "
+                        f"fast path {fast:7.3f}s  speedup {slow / fast:5.1f}x  identical={same}")
+
+                transaction.set_rollback(True)
@@ -0,0 +1,66 @@
+import json
+import subprocess
+import sys
+from django.core.management.base import BaseCommand, CommandError
+
+# Libraries that must only be imported on demand
+HEAVY_MODULES = ('numpy', 'pandas', 'openpyxl')
+
+# Runs in a fresh interpreter: what a gunicorn worker does before its first response
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import backend.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss_mb = rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+print(json.dumps({
+    'import_ms': round(elapsed * 1000, 1),
+    'rss_mb': round(rss_mb, 1),
+    'heavy': [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def probe_worker():
+    output = subprocess.run([sys.executable, '-c', PROBE], check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = "Measure cold-start import time and RSS of a web worker and enforce a budget."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=3,
+                            help="Number of cold starts to sample.")
+        parser.add_argument('--max-import-ms', type=float, default=2000,
+                            help="Fail if the slowest worker takes longer to import.")
+        parser.add_argument('--max-rss-mb', type=float, default=150,
+                            help="Fail if any worker's RSS exceeds this.")
+
+    def handle(self, *args, **options):
+        samples = [probe_worker() for _ in range(options['workers'])]
+        for i, sample in enumerate(samples, start=1):
+            self.stdout.write(
+                f"worker {i}: import {sample['import_ms']:.1f} ms, RSS {sample['rss_mb']:.1f} MB")
+
+        problems = []
+        slowest = max(s['import_ms'] for s in samples)
+        largest = max(s['rss_mb'] for s in samples)
+        heavy = sorted({m for s in samples for m in s['heavy']})
+        if slowest > options['max_import_ms']:
+            problems.append(
+                f"import time {slowest} ms exceeds {options['max_import_ms']} ms")
+        if largest > options['max_rss_mb']:
+            problems.append(
+                f"RSS {largest} MB exceeds {options['max_rss_mb']} MB")
+        if heavy:
+            problems.append(
+                f"heavy modules imported at startup: {', '.join(heavy)}")
+
+        if problems:
+            raise CommandError("Startup budget exceeded: " + "; ".join(problems))
+        self.stdout.write(self.style.SUCCESS("Startup within budget"))
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.integrity import CHECKS, CHUNK_SIZE, run_check
+
+
+class Command(BaseCommand):
+    help = "Check (and optionally repair) Customer/CustomerPayment <-> Income links across all users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true',
+                            help="Fix what is found instead of only reporting it.")
+        parser.add_argument('--user', help="Only check this username.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--check', action='append', choices=[c['name'] for c in CHECKS],
+                            help="Run only these checks (repeatable). Checks whose fix may "
+                                 "delete user-entered rows are only repaired when named here.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['user']}")
+
+        checks = [c for c in CHECKS if not options['check']
+                  or c['name'] in options['check']]
+        total_issues = 0
+        left_alone = []
+        for check in checks:
+            def report(row, name=check['name']):
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"  {name}: {row}")
+
+            repair = options['repair'] and (
+                not check.get('explicit') or check['name'] in (options['check'] or ()))
+            stats = run_check(check, repair=repair, user=user,
+                              chunk_size=options['chunk_size'], on_issue=report)
+            total_issues += stats['issues']
+            if options['repair'] and not repair and stats['issues']:
+                left_alone.append(check['name'])
+            self.stdout.write(
+                f"{stats['check']:26} scanned {stats['scanned']:>9}  issues {stats['issues']:>7}  "
+                f"repaired {stats['repaired']:>7}  {stats['rows_per_second']:>9} rows/s")
+
+        for name in left_alone:
+            self.stdout.write(self.style.WARNING(
+                f"{name} was not repaired; review it with -v 2 and re-run with "
+                f"--check {name} --repair to fix it"))
+        if total_issues and not options['repair']:
+            self.stdout.write(self.style.WARNING(
+                f"{total_issues} issues found; re-run with --repair to fix them"))
+        elif not total_issues:
+            self.stdout.write(self.style.SUCCESS("Ledger links are consistent"))
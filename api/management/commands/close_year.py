@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.archive import close_year
+
+
+class Command(BaseCommand):
+    help = "Archive a user's transactions up to the end of a fiscal year, keeping summary rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('year', type=int,
+                            help="Fiscal year to close (the year it starts in).")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+            result = close_year(user, options['year'])
+        except (User.DoesNotExist, ValueError) as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed through {result['closed_through']}: archived "
+            f"{result['incomes']} incomes and {result['expenses']} expenses"))
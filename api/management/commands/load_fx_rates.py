@@ -0,0 +1,54 @@
+import csv
+import datetime
+import sys
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from api.models import FxRate
+from api.currency import clear_rate_cache
+
+BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = "Load FX rates from a CSV with date,base,quote,rate columns (e.g. 2025-01-31,USD,LKR,296.5)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file, or - for stdin.")
+        parser.add_argument('--no-inverse', action='store_true',
+                            help="Don't derive quote/base rates from each row.")
+
+    def _read(self, handle):
+        for line, row in enumerate(csv.DictReader(handle), start=2):
+            try:
+                day = datetime.date.fromisoformat(row['date'].strip())
+                base, quote = row['base'].strip().upper(), row['quote'].strip().upper()
+                value = Decimal(row['rate'].strip())
+            except (KeyError, AttributeError, ValueError, InvalidOperation):
+                raise CommandError(f"Line {line}: expected date,base,quote,rate")
+            if value <= 0 or len(base) != 3 or len(quote) != 3:
+                raise CommandError(f"Line {line}: invalid currency pair or rate")
+            yield day, base, quote, value
+
+    def handle(self, *args, **options):
+        rates = {}
+        inverses = {}
+        try:
+            handle = sys.stdin if options['path'] == '-' else open(options['path'], newline='')
+        except OSError as exc:
+            raise CommandError(exc)
+        with handle:
+            for day, base, quote, value in self._read(handle):
+                rates[(base, quote, day)] = value
+                inverses[(quote, base, day)] = (1 / value).quantize(Decimal('1e-8'))
+
+        if not options['no_inverse']:
+            # A rate given explicitly in the file wins over a derived one
+            rates = {**inverses, **rates}
+
+        rows = [FxRate(base=base, quote=quote, date=day, rate=value)
+                for (base, quote, day), value in rates.items()]
+        FxRate.objects.bulk_create(
+            rows, batch_size=BATCH_SIZE, update_conflicts=True,
+            unique_fields=['base', 'quote', 'date'], update_fields=['rate'])
+        clear_rate_cache()
+        self.stdout.write(self.style.SUCCESS(f"Loaded {len(rows)} rates"))
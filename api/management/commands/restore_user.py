@@ -0,0 +1,42 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.snapshot import restore_snapshot
+from .snapshot_user import peak_rss_mb
+
+
+class Command(BaseCommand):
+    help = "Restore a snapshot written by snapshot_user into a user, remapping all ids."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="User to restore into.")
+        parser.add_argument('path')
+        parser.add_argument('--create', action='store_true',
+                            help="Create the user (without a usable password) if missing.")
+        parser.add_argument('--replace', action='store_true',
+                            help="Delete the user's existing data first.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            if not options['create']:
+                raise CommandError(
+                    f"No user named {options['username']} (use --create)")
+            user = User.objects.create_user(options['username'])
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as snapshot:
+                counts = restore_snapshot(
+                    user, snapshot, replace=options['replace'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+        elapsed = time.perf_counter() - started
+
+        rows = sum(counts.values())
+        for section, count in counts.items():
+            self.stdout.write(f"  {section:18} {count:>9}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Restored {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s, "
+            f"peak RSS {peak_rss_mb():.1f} MB)"))
@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+import socket
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from api.jobs import claim_next, run_job, requeue_stale
+
+
+# How often each worker hands jobs of dead workers back to the queue
+REQUEUE_INTERVAL = 60.0
+
+
+def work(worker_id, poll_interval, burst):
+    # Never share the parent's DB connections across a fork
+    connections.close_all()
+    next_requeue = 0.0
+    while True:
+        close_old_connections()
+        if time.monotonic() >= next_requeue:
+            requeue_stale()
+            next_requeue = time.monotonic() + REQUEUE_INTERVAL
+        job = claim_next(worker_id)
+        if job is None:
+            if burst:
+                return
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+
+
+class Command(BaseCommand):
+    help = "Run background job workers against the database job queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2,
+                            help="Number of worker processes.")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--burst', action='store_true',
+                            help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs")
+
+        base_id = f"{socket.gethostname()}:{os.getpid()}"
+        processes = options['processes']
+        if processes <= 1:
+            work(base_id, options['poll_interval'], options['burst'])
+            return
+
+        connections.close_all()
+        pool = [
+            multiprocessing.Process(target=work, args=(
+                f"{base_id}:{i}", options['poll_interval'], options['burst']))
+            for i in range(processes)
+        ]
+        for process in pool:
+            process.start()
+        self.stdout.write(self.style.SUCCESS(
+            f"Started {processes} workers"))
+        try:
+            for process in pool:
+                process.join()
+        except KeyboardInterrupt:
+            for process in pool:
+                process.terminate()
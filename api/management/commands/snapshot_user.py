@@ -0,0 +1,35 @@
+import resource
+import sys
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.snapshot import iter_snapshot
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+class Command(BaseCommand):
+    help = "Stream one user's ledger to a gzip-compressed JSON-lines snapshot file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help="Output file, e.g. alice.snapshot.jsonl.gz")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']}")
+
+        started = time.perf_counter()
+        written = 0
+        with open(options['path'], 'wb') as out:
+            for chunk in iter_snapshot(user):
+                out.write(chunk)
+                written += len(chunk)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written / 1024:.1f} KB in {elapsed:.2f}s (peak RSS {peak_rss_mb():.1f} MB)"))
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_employee_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Budget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('Food', 'Food'), ('Transport', 'Transport'), ('Utilities', 'Utilities'), ('Entertainment', 'Entertainment'), ('Healthcare', 'Healthcare'), ('Education', 'Education'), ('Housing', 'Housing'), ('Salary', 'Salary'), ('Liability', 'Debt Repayment'), ('Other', 'Other')], max_length=50)),
+                ('period', models.CharField(choices=[('Weekly', 'Weekly'), ('Monthly', 'Monthly'), ('Yearly', 'Yearly')], default='Monthly', max_length=20)),
+                ('limit', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('alert_threshold', models.PositiveSmallIntegerField(default=80)),
+                ('spent', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('period_start', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'category', 'period'), name='unique_budget_per_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='liability',
+            name='interest_rate',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='liability',
+            name='minimum_payment',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+    ]
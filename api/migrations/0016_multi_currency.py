@@ -0,0 +1,91 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:53
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_income_expense_date_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base', models.CharField(max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')])),
+                ('quote', models.CharField(max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')])),
+                ('date', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_currency', models.CharField(default='LKR', max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')])),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='ledgersummary',
+            name='unique_ledger_summary',
+        ),
+        migrations.AddField(
+            model_name='archivedexpense',
+            name='currency',
+            field=models.CharField(default='LKR', max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AddField(
+            model_name='archivedincome',
+            name='currency',
+            field=models.CharField(default='LKR', max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='currency',
+            field=models.CharField(default='LKR', max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AddField(
+            model_name='customerpayment',
+            name='currency',
+            field=models.CharField(default='LKR', max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='currency',
+            field=models.CharField(default='LKR', max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='currency',
+            field=models.CharField(default='LKR', max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AddField(
+            model_name='ledgersummary',
+            name='currency',
+            field=models.CharField(default='LKR', max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AddField(
+            model_name='recurringtransaction',
+            name='currency',
+            field=models.CharField(default='LKR', max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AddConstraint(
+            model_name='ledgersummary',
+            constraint=models.UniqueConstraint(fields=('user', 'kind', 'year', 'month', 'category', 'currency'), name='unique_ledger_summary_currency'),
+        ),
+        migrations.AddConstraint(
+            model_name='fxrate',
+            constraint=models.UniqueConstraint(fields=('base', 'quote', 'date'), name='unique_fx_rate'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
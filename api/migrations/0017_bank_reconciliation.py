@@ -0,0 +1,58 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:55
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_multi_currency'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankStatementLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('currency', models.CharField(default='LKR', max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')])),
+                ('description', models.CharField(blank=True, default='', max_length=255)),
+                ('reference', models.CharField(blank=True, default='', max_length=100)),
+                ('imported_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedexpense',
+            name='reconciled_with',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.bankstatementline'),
+        ),
+        migrations.AddField(
+            model_name='archivedincome',
+            name='reconciled_with',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.bankstatementline'),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='reconciled_with',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='expense', to='api.bankstatementline'),
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='reconciled_with',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='income', to='api.bankstatementline'),
+        ),
+        migrations.AddIndex(
+            model_name='bankstatementline',
+            index=models.Index(fields=['user', 'date'], name='bankline_user_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bankstatementline',
+            constraint=models.UniqueConstraint(condition=models.Q(('reference', ''), _negated=True), fields=('user', 'reference'), name='unique_bankline_reference'),
+        ),
+    ]
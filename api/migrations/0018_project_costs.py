@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:57
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_bank_reconciliation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedexpense',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.customer'),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='expenses', to='api.customer'),
+        ),
+        migrations.CreateModel(
+            name='SalaryAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('currency', models.CharField(default='LKR', max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')])),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='salary_allocations', to='api.customer')),
+                ('salary_payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocations', to='api.salarypayment')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('salary_payment', 'customer'), name='unique_salary_allocation')],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 6.0.1 on 2026-10-19 13:06
+
+import api.models
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_project_costs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedexpense',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AlterField(
+            model_name='archivedincome',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AlterField(
+            model_name='bankstatementline',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AlterField(
+            model_name='customerpayment',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AlterField(
+            model_name='income',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AlterField(
+            model_name='ledgersummary',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AlterField(
+            model_name='recurringtransaction',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AlterField(
+            model_name='salaryallocation',
+            name='currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='base_currency',
+            field=models.CharField(default=api.models.default_currency, max_length=3, validators=[django.core.validators.RegexValidator('^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')]),
+        ),
+    ]
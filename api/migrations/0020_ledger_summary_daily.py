@@ -0,0 +1,55 @@
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def summarise_by_day(apps, schema_editor):
+    # Rebuild the summaries from the archive tables, which still hold every row
+    LedgerSummary = apps.get_model('api', 'LedgerSummary')
+    LedgerSummary.objects.all().delete()
+    for kind, model_name, group_by in (
+            ('income', 'ArchivedIncome', ['user_id', 'date', 'currency']),
+            ('expense', 'ArchivedExpense', ['user_id', 'date', 'currency', 'category'])):
+        groups = apps.get_model('api', model_name).objects.values(*group_by).annotate(
+            total=Sum('amount'), count=Count('id')).order_by()
+        LedgerSummary.objects.bulk_create((
+            LedgerSummary(kind=kind, year=group['date'].year, month=group['date'].month,
+                          **{'category': '', **group})
+            for group in groups.iterator()), batch_size=2000)
+
+
+def summarise_by_month(apps, schema_editor):
+    LedgerSummary = apps.get_model('api', 'LedgerSummary')
+    groups = list(LedgerSummary.objects.values(
+        'user_id', 'kind', 'year', 'month', 'category', 'currency').annotate(
+        total=Sum('total'), count=Sum('count')).order_by())
+    LedgerSummary.objects.all().delete()
+    LedgerSummary.objects.bulk_create((LedgerSummary(**group) for group in groups), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_currency_default_callable'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='ledgersummary',
+            name='unique_ledger_summary_currency',
+        ),
+        migrations.AddField(
+            model_name='ledgersummary',
+            name='date',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(summarise_by_day, summarise_by_month),
+        migrations.AlterField(
+            model_name='ledgersummary',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AddConstraint(
+            model_name='ledgersummary',
+            constraint=models.UniqueConstraint(fields=('user', 'kind', 'date', 'category', 'currency'), name='unique_ledger_summary_day'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.validators import RegexValidator
 import datetime
 
 # Options for Expense Categories
@@ -16,6 +18,19 @@ CATEGORY_CHOICES = [
     ('Other', 'Other'),
 ]
 
+# ISO 4217 code, e.g. LKR or USD
+currency_validator = RegexValidator(
+    r'^[A-Z]{3}$', 'Use a 3-letter ISO currency code, e.g. USD.')
+
+
+def default_currency():
+    # A callable, so DEFAULT_CURRENCY is read at runtime and never baked into migrations
+    return settings.DEFAULT_CURRENCY
+
+
+def currency_field():
+    return models.CharField(max_length=3, default=default_currency, validators=[currency_validator])
+
 
 class Income(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -25,6 +40,26 @@ class Income(models.Model):
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Set when the row was generated from a RecurringTransaction
+    recurring_rule = models.ForeignKey(
+        'RecurringTransaction', on_delete=models.SET_NULL, null=True, blank=True, related_name='incomes')
+    currency = currency_field()
+    # Bank statement line this was matched to by reconciliation
+    reconciled_with = models.OneToOneField(
+        'BankStatementLine', on_delete=models.SET_NULL, null=True, blank=True, related_name='income')
+
+    class Meta:
+        constraints = [
+            # Makes materialization idempotent: one row per rule per date
+            models.UniqueConstraint(
+                fields=['recurring_rule', 'date'], name='unique_income_occurrence'),
+        ]
+        indexes = [
+            # Per-user ledger ordered by date, and the admin date hierarchy
+            models.Index(fields=['user', 'date'], name='income_user_date_idx'),
+            models.Index(fields=['date'], name='income_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.source} - {self.amount}"
 
@@ -37,6 +72,25 @@ class Expense(models.Model):
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    recurring_rule = models.ForeignKey(
+        'RecurringTransaction', on_delete=models.SET_NULL, null=True, blank=True, related_name='expenses')
+    currency = currency_field()
+    reconciled_with = models.OneToOneField(
+        'BankStatementLine', on_delete=models.SET_NULL, null=True, blank=True, related_name='expense')
+    # Project this cost is attributed to, for profitability
+    customer = models.ForeignKey(
+        'Customer', on_delete=models.SET_NULL, null=True, blank=True, related_name='expenses')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recurring_rule', 'date'], name='unique_expense_occurrence'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'date'], name='expense_user_date_idx'),
+            models.Index(fields=['date'], name='expense_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.category} - {self.amount}"
 
@@ -50,6 +104,12 @@ class Liability(models.Model):
     due_date = models.DateField(null=True, blank=True)
     is_settled = models.BooleanField(default=False)
 
+    # Used by the payoff planner
+    interest_rate = models.DecimalField(
+        max_digits=5, decimal_places=2, default=0)  # Annual %, e.g. 18.50
+    minimum_payment = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0)  # Per month
+
     @property
     def remaining_amount(self):
         return self.total_amount - self.paid_amount
@@ -88,6 +148,26 @@ class SalaryPayment(models.Model):
         return f"{self.employee.name} - {self.title}"
 
 
+class SalaryAllocation(models.Model):
+    """Share of a salary payment charged to a project as cost."""
+    salary_payment = models.ForeignKey(
+        SalaryPayment, on_delete=models.CASCADE, related_name='allocations')
+    customer = models.ForeignKey(
+        'Customer', on_delete=models.CASCADE, related_name='salary_allocations')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # Salaries are paid in the user's base currency at the time
+    currency = currency_field()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['salary_payment', 'customer'], name='unique_salary_allocation'),
+        ]
+
+    def __str__(self):
+        return f"{self.salary_payment} -> {self.customer.project_name}: {self.amount}"
+
+
 class Customer(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=200)
@@ -99,6 +179,7 @@ class Customer(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     advance_amount = models.DecimalField(
         max_digits=10, decimal_places=2, default=0)
+    currency = currency_field()  # Payments and their incomes use this too
 
     # --- NEW LINK: Connects this customer's advance to an Income ID ---
     advance_income_record = models.OneToOneField(
@@ -122,6 +203,7 @@ class CustomerPayment(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateField(default=datetime.date.today)
     note = models.CharField(max_length=200, blank=True, null=True)
+    currency = currency_field()
 
     # --- NEW LINK: Connects this partial payment to an Income ID ---
     income_record = models.OneToOneField(
@@ -132,3 +214,259 @@ class CustomerPayment(models.Model):
 
     def __str__(self):
         return f"{self.customer.name} - {self.amount}"
+
+
+class Budget(models.Model):
+    PERIOD_CHOICES = [
+        ('Weekly', 'Weekly'),
+        ('Monthly', 'Monthly'),
+        ('Yearly', 'Yearly'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
+    period = models.CharField(
+        max_length=20, choices=PERIOD_CHOICES, default='Monthly')
+    limit = models.DecimalField(max_digits=12, decimal_places=2)
+    # Percentage of the limit at which a warning alert is raised
+    alert_threshold = models.PositiveSmallIntegerField(default=80)
+
+    # Running total for the current period, kept up to date by api.budgets
+    # whenever an Expense is written, so reads never aggregate Expense.
+    spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    period_start = models.DateField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category', 'period'], name='unique_budget_per_period'),
+        ]
+
+    @property
+    def remaining_amount(self):
+        return self.limit - self.spent
+
+    @property
+    def utilization(self):
+        if not self.limit:
+            return 0
+        return round(float(self.spent / self.limit * 100), 2)
+
+    def __str__(self):
+        return f"{self.category} {self.period} budget ({self.spent}/{self.limit})"
+
+
+class RecurringTransaction(models.Model):
+    KIND_CHOICES = [
+        ('income', 'Income'),
+        ('expense', 'Expense'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Used as Income.source, or as the Expense description prefix
+    title = models.CharField(max_length=255)
+    category = models.CharField(
+        max_length=50, choices=CATEGORY_CHOICES, blank=True, null=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = currency_field()
+    description = models.TextField(blank=True, null=True)
+
+    # RFC 5545 recurrence rule, e.g. "FREQ=MONTHLY;BYMONTHDAY=1"
+    rule = models.CharField(max_length=255)
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+
+    # First occurrence not yet written to Income/Expense (null once exhausted)
+    next_occurrence = models.DateField(null=True, blank=True, db_index=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.title} ({self.rule})"
+
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Name of a task registered in api.tasks
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)  # 0-100
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, null=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(auto_now_add=True)
+    locked_by = models.CharField(max_length=100, blank=True, null=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's claim query: oldest queued job that is ready to run
+            models.Index(fields=['status', 'run_after'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+# --- Ledger archive: closed fiscal years ---
+# Archived rows keep their original ids and the exact column order of
+# Income/Expense so the two tables can be UNIONed, but carry no indexes
+# beyond the primary key.
+
+
+class ArchivedIncome(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    source = models.CharField(max_length=255)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    date = models.DateField()
+    description = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    recurring_rule = models.ForeignKey(
+        'RecurringTransaction', on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name='+')
+    currency = currency_field()
+    reconciled_with = models.ForeignKey(
+        'BankStatementLine', on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name='+')
+
+    def __str__(self):
+        return f"{self.source} - {self.amount} (archived)"
+
+
+class ArchivedExpense(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    date = models.DateField()
+    description = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    recurring_rule = models.ForeignKey(
+        'RecurringTransaction', on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name='+')
+    currency = currency_field()
+    reconciled_with = models.ForeignKey(
+        'BankStatementLine', on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name='+')
+    # Indexed, unlike the other archive FKs: profitability sums it per project
+    customer = models.ForeignKey(
+        'Customer', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    def __str__(self):
+        return f"{self.category} - {self.amount} (archived)"
+
+
+class LedgerSummary(models.Model):
+    """
+    Per-day (and per-category for expenses) totals of archived rows. Daily so
+    they convert at the same rate as the rows they replace did in the hot table.
+    """
+    KIND_CHOICES = [
+        ('income', 'Income'),
+        ('expense', 'Expense'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    date = models.DateField()
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    category = models.CharField(max_length=50, blank=True, default='')
+    currency = currency_field()
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'kind', 'date', 'category', 'currency'], name='unique_ledger_summary_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.year}-{self.month:02d} {self.category} {self.total}"
+
+
+class LedgerClosure(models.Model):
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name='ledger_closure')
+    # Transactions on or before this date may live in the archive tables
+    closed_through = models.DateField()
+    closed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} closed through {self.closed_through}"
+
+
+# --- Currencies ---
+
+
+class UserProfile(models.Model):
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name='profile')
+    # Dashboard and budget figures are converted into this currency
+    base_currency = currency_field()
+
+    def __str__(self):
+        return f"{self.user} ({self.base_currency})"
+
+
+class FxRate(models.Model):
+    """Units of `quote` per one unit of `base` on `date`, loaded with load_fx_rates."""
+    base = models.CharField(max_length=3, validators=[currency_validator])
+    quote = models.CharField(max_length=3, validators=[currency_validator])
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+
+    class Meta:
+        constraints = [
+            # Also the index behind the "latest rate on or before a date" lookup
+            models.UniqueConstraint(
+                fields=['base', 'quote', 'date'], name='unique_fx_rate'),
+        ]
+
+    def __str__(self):
+        return f"{self.base}/{self.quote} {self.date}: {self.rate}"
+
+
+# --- Reconciliation ---
+
+
+class BankStatementLine(models.Model):
+    """One imported bank statement line; credits are positive, debits negative."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    currency = currency_field()
+    description = models.CharField(max_length=255, blank=True, default='')
+    # The bank's own transaction id, when the export has one; stops double imports
+    reference = models.CharField(max_length=100, blank=True, default='')
+    imported_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='bankline_user_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'reference'], condition=~models.Q(reference=''),
+                name='unique_bankline_reference'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.amount} {self.description}"
@@ -0,0 +1,118 @@
+# NumPy is imported inside the functions so loading the API (and every
+# gunicorn worker boot) doesn't pay for it until a plan is requested.
+
+MAX_MONTHS = 360
+STRATEGIES = ('avalanche', 'snowball')
+
+
+def _allocate(extra, remaining, order):
+    """Pour `extra` into `remaining` balances following `order`, vectorized via cumsum."""
+    import numpy as np
+
+    ordered = remaining[order]
+    before = np.cumsum(ordered) - ordered
+    paid = np.clip(extra - before, 0, ordered)
+    allocation = np.empty_like(paid)
+    allocation[order] = paid
+    return allocation
+
+
+def simulate(balances, annual_rates, minimums, monthly_budget, strategy, max_months=MAX_MONTHS):
+    """
+    Simulate paying off all debts with a fixed monthly budget.
+
+    Every month interest accrues, each debt gets its minimum payment, and the
+    rest of the budget goes to the highest-rate debt (avalanche) or the
+    smallest balance (snowball). Each month is one set of array operations
+    across all debts, so cost grows with months, not months x debts.
+
+    Returns a dict of NumPy arrays shaped (months, debts).
+    """
+    import numpy as np
+
+    balance = np.asarray(balances, dtype=np.float64).copy()
+    monthly_rate = np.asarray(annual_rates, dtype=np.float64) / 100 / 12
+    minimums = np.asarray(minimums, dtype=np.float64)
+    n = balance.size
+
+    payments = np.zeros((max_months, n))
+    interest = np.zeros((max_months, n))
+    balances_out = np.zeros((max_months, n))
+    # Ties broken by position so results are stable
+    avalanche_order = np.lexsort((np.arange(n), -monthly_rate))
+
+    months = 0
+    while months < max_months and (balance > 0.005).any():
+        accrued = balance * monthly_rate
+        balance += accrued
+
+        minimum_paid = np.minimum(minimums, balance)
+        remaining = balance - minimum_paid
+        extra = max(monthly_budget - minimum_paid.sum(), 0.0)
+
+        if strategy == 'snowball':
+            # Smallest outstanding balance first; settled debts sink to the end
+            order = np.lexsort((np.arange(n), np.where(remaining > 0, remaining, np.inf)))
+        else:
+            order = avalanche_order
+        paid = minimum_paid + _allocate(extra, remaining, order)
+        balance -= paid
+
+        payments[months] = paid
+        interest[months] = accrued
+        balances_out[months] = balance
+        months += 1
+
+    return {
+        'months': months,
+        'paid_off': bool((balance <= 0.005).all()),
+        'payments': payments[:months],
+        'interest': interest[:months],
+        'balances': balances_out[:months],
+    }
+
+
+def plan(liabilities, monthly_budget, include_schedule=False):
+    """Run every strategy for `liabilities` (dicts from .values()) and summarise."""
+    import numpy as np
+
+    ids = [l['id'] for l in liabilities]
+    titles = [l['title'] for l in liabilities]
+    balances = [float(l['remaining']) for l in liabilities]
+    rates = [float(l['interest_rate']) for l in liabilities]
+    minimums = [float(l['minimum_payment']) for l in liabilities]
+
+    results = {}
+    for strategy in STRATEGIES:
+        run = simulate(balances, rates, minimums, monthly_budget, strategy)
+        settled = run['balances'] <= 0.005
+        # First month each debt reaches zero (1-based), None if never
+        payoff_month = np.where(settled.any(axis=0), settled.argmax(axis=0) + 1, 0)
+
+        result = {
+            'months': run['months'],
+            'paid_off': run['paid_off'],
+            'total_interest': round(float(run['interest'].sum()), 2),
+            'total_paid': round(float(run['payments'].sum()), 2),
+            'payoff_order': sorted(
+                ({'id': ids[i], 'title': titles[i], 'month': int(payoff_month[i]) or None}
+                 for i in range(len(ids))),
+                key=lambda d: (d['month'] is None, d['month'] or 0)),
+            'schedule': [
+                {'month': m + 1, 'payment': round(p, 2), 'interest': round(i, 2), 'balance': round(b, 2)}
+                for m, (p, i, b) in enumerate(zip(
+                    run['payments'].sum(axis=1).tolist(),
+                    run['interest'].sum(axis=1).tolist(),
+                    run['balances'].sum(axis=1).tolist()))
+            ],
+        }
+        if include_schedule:
+            result['debts'] = {
+                ids[i]: {
+                    'payments': np.round(run['payments'][:, i], 2).tolist(),
+                    'balances': np.round(np.maximum(run['balances'][:, i], 0), 2).tolist(),
+                }
+                for i in range(len(ids))
+            }
+        results[strategy] = result
+    return results
@@ -0,0 +1,66 @@
+from decimal import Decimal
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .models import Customer, CustomerPayment, Expense, ArchivedExpense, SalaryAllocation
+from .currency import converted_amount, round_money
+
+MONEY = DecimalField(max_digits=28, decimal_places=8)
+
+ORDERING = ('revenue', 'cost', 'margin', 'outstanding', 'project_name')
+
+
+def _per_customer(queryset, fk, value):
+    # Correlated SUM per project: each one is an index lookup on `fk`, and
+    # unlike JOIN + GROUP BY the three cost sources can't multiply each other's rows
+    totals = queryset.filter(**{fk: OuterRef('pk')}).order_by().values(fk).annotate(
+        total=Sum(value)).values('total')
+    return Coalesce(Subquery(totals, output_field=MONEY), Value(0, output_field=MONEY))
+
+
+def _unconverted(queryset, fk, value):
+    # COUNT(expr) skips NULLs, so the difference is the rows with no FX rate
+    counts = queryset.filter(**{fk: OuterRef('pk')}).order_by().values(fk).annotate(
+        missing=Count('pk') - Count(value)).values('missing')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def project_profitability(user, ordering='-margin'):
+    """
+    Revenue, cost, margin and outstanding balance for every project of `user`,
+    in one query and in each project's own currency. Costs are attributed
+    expenses (archived ones included) plus salary allocations, converted in SQL.
+    Costs with no FX rate to the project's currency are left out and counted
+    in `unconverted_count`; such a project gets no margin_percent.
+    """
+    in_project_currency = converted_amount(OuterRef('currency'))
+    salary_in_project_currency = converted_amount(
+        OuterRef('currency'), date='salary_payment__payment_date')
+    revenue = F('advance_amount') + _per_customer(CustomerPayment.objects, 'customer', 'amount')
+    expense_cost = (_per_customer(Expense.objects, 'customer', in_project_currency)
+                    + _per_customer(ArchivedExpense.objects, 'customer', in_project_currency))
+    salary_cost = _per_customer(SalaryAllocation.objects, 'customer', salary_in_project_currency)
+    unconverted = (_unconverted(Expense.objects, 'customer', in_project_currency)
+                   + _unconverted(ArchivedExpense.objects, 'customer', in_project_currency)
+                   + _unconverted(SalaryAllocation.objects, 'customer', salary_in_project_currency))
+
+    rows = Customer.objects.filter(user=user).annotate(
+        revenue=revenue, expense_cost=expense_cost, salary_cost=salary_cost,
+        unconverted_count=unconverted,
+    ).annotate(
+        cost=F('expense_cost') + F('salary_cost'),
+    ).annotate(
+        margin=F('revenue') - F('cost'),
+        outstanding=F('total_amount') - F('revenue'),
+    ).order_by(ordering, 'id').values(
+        'id', 'name', 'project_name', 'currency', 'total_amount', 'revenue',
+        'expense_cost', 'salary_cost', 'cost', 'margin', 'outstanding',
+        'unconverted_count', 'is_project_delivered')
+
+    for row in rows:
+        for field in ('revenue', 'expense_cost', 'salary_cost', 'cost', 'margin', 'outstanding'):
+            row[field] = round_money(Decimal(row[field]))
+        # A margin over incomplete costs would overstate it
+        row['margin_percent'] = (
+            round(row['margin'] * 100 / row['revenue'], 1)
+            if row['revenue'] and not row['unconverted_count'] else None)
+        yield row
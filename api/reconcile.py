@@ -0,0 +1,166 @@
+import bisect
+import csv
+import datetime
+import io
+import re
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import Max, Min
+from .models import Income, Expense, ArchivedIncome, ArchivedExpense, BankStatementLine
+
+# How far a bank line's date may be from the transaction it matches
+DATE_WINDOW_DAYS = 3
+BULK_BATCH_SIZE = 1000
+
+_WORDS = re.compile(r'[a-z0-9]+')
+
+
+def _tokens(*parts):
+    return frozenset(_WORDS.findall(' '.join(p for p in parts if p).lower()))
+
+
+def _similarity(a, b):
+    # Jaccard over words: cheap, and order-insensitive like bank descriptions
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _key(kind, currency, amount):
+    return kind, currency, int(abs(amount) * 100)
+
+
+class _Index:
+    """
+    Unreconciled transactions hashed by (kind, currency, amount in cents), each
+    bucket sorted by date so the candidates for a line are found with two
+    bisects. Matching n lines against m transactions is O((n + m) log m) plus
+    the size of each date window.
+    """
+
+    def __init__(self):
+        self.buckets = defaultdict(list)
+
+    def add(self, key, day, pk, tokens):
+        self.buckets[key].append((day.toordinal(), pk, tokens))
+
+    def freeze(self):
+        for bucket in self.buckets.values():
+            bucket.sort(key=lambda entry: entry[:2])
+        self.dates = {key: [entry[0] for entry in bucket]
+                      for key, bucket in self.buckets.items()}
+
+    def take(self, key, day, tokens, window):
+        """Remove and return the pk of the best candidate for a line, or None."""
+        bucket = self.buckets.get(key)
+        if not bucket:
+            return None
+        day = day.toordinal()
+        dates = self.dates[key]
+        low = bisect.bisect_left(dates, day - window)
+        high = bisect.bisect_right(dates, day + window)
+        if low == high:
+            return None
+        # Same amount and close in date; the description breaks ties, then the nearer date
+        best = max(range(low, high), key=lambda i: (
+            _similarity(tokens, bucket[i][2]), -abs(bucket[i][0] - day), -bucket[i][1]))
+        del dates[best]
+        return bucket.pop(best)[1]
+
+
+def unmatched_lines(user):
+    lines = BankStatementLine.objects.filter(
+        user=user, income__isnull=True, expense__isnull=True)
+    # Lines linked from archived transactions still count as matched
+    for model in (ArchivedIncome, ArchivedExpense):
+        lines = lines.exclude(id__in=model.objects.filter(
+            user=user, reconciled_with__isnull=False).values('reconciled_with_id'))
+    return lines
+
+
+def statement_span(user):
+    """(first, last) date covered by the user's imported statements."""
+    span = BankStatementLine.objects.filter(user=user).aggregate(
+        first=Min('date'), last=Max('date'))
+    return span['first'], span['last']
+
+
+def reconcile(user, window=DATE_WINDOW_DAYS):
+    """
+    Match every unmatched bank line of `user` to an unreconciled Income
+    (credits) or Expense (debits) with the same currency and amount, dated
+    within `window` days, and store the links.
+    """
+    lines = list(unmatched_lines(user).order_by('date', 'id').values_list(
+        'id', 'date', 'amount', 'currency', 'description'))
+    if not lines:
+        return {'lines': 0, 'matched': 0, 'unmatched': 0}
+
+    margin = datetime.timedelta(days=window)
+    span = (lines[0][1] - margin, lines[-1][1] + margin)
+    index = _Index()
+    for pk, amount, currency, day, source, description in Income.objects.filter(
+            user=user, reconciled_with__isnull=True, date__range=span).values_list(
+            'id', 'amount', 'currency', 'date', 'source', 'description').iterator():
+        index.add(_key('income', currency, amount), day, pk, _tokens(source, description))
+    for pk, amount, currency, day, category, description in Expense.objects.filter(
+            user=user, reconciled_with__isnull=True, date__range=span).values_list(
+            'id', 'amount', 'currency', 'date', 'category', 'description').iterator():
+        index.add(_key('expense', currency, amount), day, pk, _tokens(category, description))
+    index.freeze()
+
+    incomes, expenses = [], []
+    for line_id, day, amount, currency, description in lines:
+        kind = 'income' if amount > 0 else 'expense'
+        pk = index.take(_key(kind, currency, amount), day, _tokens(description), window)
+        if pk is None:
+            continue
+        if kind == 'income':
+            incomes.append(Income(id=pk, reconciled_with_id=line_id))
+        else:
+            expenses.append(Expense(id=pk, reconciled_with_id=line_id))
+
+    with transaction.atomic():
+        Income.objects.bulk_update(incomes, ['reconciled_with'], batch_size=BULK_BATCH_SIZE)
+        Expense.objects.bulk_update(expenses, ['reconciled_with'], batch_size=BULK_BATCH_SIZE)
+
+    matched = len(incomes) + len(expenses)
+    return {'lines': len(lines), 'matched': matched, 'unmatched': len(lines) - matched}
+
+
+# --- Statement import ---
+
+
+def _amount(value, line):
+    try:
+        return Decimal((value or '0').replace(',', '').strip() or '0')
+    except InvalidOperation:
+        raise ValueError(f"Line {line}: invalid amount {value!r}")
+
+
+def parse_statement(fileobj):
+    """
+    Read a CSV statement into dicts for BankStatementLineSerializer. Needs a
+    date column and either a signed amount or separate credit/debit columns;
+    description, reference and currency are optional.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+    columns = {c.strip().lower() for c in reader.fieldnames or []}
+    if 'date' not in columns or not ({'amount'} <= columns or {'credit', 'debit'} <= columns):
+        raise ValueError("Statement needs date and amount (or credit and debit) columns")
+
+    rows = []
+    for line, raw in enumerate(reader, start=2):
+        raw = {k.strip().lower(): (v or '').strip() for k, v in raw.items() if isinstance(k, str)}
+        if 'amount' in columns:
+            amount = _amount(raw['amount'], line)
+        else:
+            amount = _amount(raw['credit'], line) - _amount(raw['debit'], line)
+        row = {'date': raw['date'], 'amount': amount,
+               'description': raw.get('description', '')[:255],
+               'reference': raw.get('reference', '')}
+        if raw.get('currency'):
+            row['currency'] = raw['currency'].upper()
+        rows.append(row)
+    return rows
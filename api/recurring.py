@@ -0,0 +1,144 @@
+import datetime
+import re
+from collections import defaultdict
+from dateutil.rrule import rrulestr
+from django.db import transaction
+from .models import Income, Expense, RecurringTransaction
+from .budgets import record_expense, period_bounds
+from .events import publish_totals
+
+# Rules are caught up in chunks, each chunk in one transaction
+RULES_PER_CHUNK = 200
+BULK_BATCH_SIZE = 1000
+
+
+def _to_datetime(day):
+    return datetime.datetime.combine(day, datetime.time())
+
+
+# Rows are dated, not timed, so a rule can't usefully repeat within a day
+_SUB_DAILY = re.compile(r'FREQ=(HOURLY|MINUTELY|SECONDLY)\b', re.IGNORECASE)
+
+
+def parse_rule(rule, start_date):
+    return rrulestr(rule, dtstart=_to_datetime(start_date))
+
+
+def is_sub_daily(rule):
+    return bool(_SUB_DAILY.search(rule or ''))
+
+
+def next_occurrence(recurring, after=None):
+    """First occurrence strictly after `after` (or on/after start_date when not given)."""
+    rule = parse_rule(recurring.rule, recurring.start_date)
+    if after is None:
+        found = rule.after(_to_datetime(recurring.start_date), inc=True)
+    else:
+        found = rule.after(_to_datetime(after))
+    if found is None:
+        return None
+    found = found.date()
+    if recurring.end_date and found > recurring.end_date:
+        return None
+    return found
+
+
+def _occurrences(recurring, until):
+    end = min(until, recurring.end_date) if recurring.end_date else until
+    if recurring.next_occurrence is None or recurring.next_occurrence > end:
+        return []
+    rule = parse_rule(recurring.rule, recurring.start_date)
+    # Walk lazily and keep one date per day, so rules saved before sub-daily
+    # frequencies were rejected can't multiply rows or build huge lists
+    days = []
+    for found in rule.xafter(_to_datetime(recurring.next_occurrence), inc=True):
+        day = found.date()
+        if day > end:
+            break
+        if not days or days[-1] != day:
+            days.append(day)
+    return days
+
+
+def _build_row(recurring, day):
+    if recurring.kind == 'income':
+        return Income(user_id=recurring.user_id, source=recurring.title, amount=recurring.amount,
+                      date=day, description=recurring.description, recurring_rule=recurring,
+                      currency=recurring.currency)
+    return Expense(user_id=recurring.user_id, category=recurring.category or 'Other',
+                   amount=recurring.amount, currency=recurring.currency, date=day,
+                   description=recurring.description or recurring.title, recurring_rule=recurring)
+
+
+def _existing(model, rules, until):
+    """(rule id, date) pairs already written for `rules`, so re-runs skip them."""
+    first = min((rule.next_occurrence for rule in rules), default=until)
+    return set(model.objects.filter(
+        recurring_rule__in=rules, date__range=(first, until)
+    ).values_list('recurring_rule_id', 'date'))
+
+
+def _materialize_chunk(rule_ids, until):
+    incomes, expenses = [], []
+    # (user_id, category, date, currency) -> amount, applied to budgets after the insert
+    budget_deltas = defaultdict(int)
+
+    with transaction.atomic():
+        rules = list(RecurringTransaction.objects.select_for_update().filter(
+            id__in=rule_ids, is_active=True, next_occurrence__lte=until))
+        written = {'income': _existing(Income, [r for r in rules if r.kind == 'income'], until),
+                   'expense': _existing(Expense, [r for r in rules if r.kind == 'expense'], until)}
+
+        for recurring in rules:
+            for day in _occurrences(recurring, until):
+                # Counts and budgets only follow rows that are really inserted
+                if (recurring.id, day) in written[recurring.kind]:
+                    continue
+                row = _build_row(recurring, day)
+                if recurring.kind == 'income':
+                    incomes.append(row)
+                else:
+                    expenses.append(row)
+                    budget_deltas[(recurring.user_id, row.category, day, row.currency)] += row.amount
+            recurring.next_occurrence = next_occurrence(recurring, after=until)
+
+        # The rules are locked, so the rows left are new; ignore_conflicts and the
+        # (recurring_rule, date) constraints stay as a backstop against duplicates
+        Income.objects.bulk_create(
+            incomes, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+        Expense.objects.bulk_create(
+            expenses, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+        RecurringTransaction.objects.bulk_update(
+            rules, ['next_occurrence'], batch_size=BULK_BATCH_SIZE)
+
+        # Budgets only track the current period, so older occurrences can't match
+        today = datetime.date.today()
+        horizon = min(period_bounds('Weekly', today)[0],
+                      period_bounds('Yearly', today)[0])
+        for (user_id, category, day, currency), amount in budget_deltas.items():
+            if day >= horizon:
+                record_expense(user_id, category, day, amount, currency)
+
+        # bulk_create skips signals, so tell open dashboards once per user
+        for user_id in {rule.user_id for rule in rules}:
+            publish_totals(user_id)
+
+    return len(incomes) + len(expenses)
+
+
+def materialize_due(user=None, until=None):
+    """
+    Write every occurrence up to `until` (default today) for rules that are due.
+    Safe to call repeatedly; returns the number of rows generated.
+    """
+    until = until or datetime.date.today()
+    due = RecurringTransaction.objects.filter(
+        is_active=True, next_occurrence__lte=until)
+    if user is not None:
+        due = due.filter(user=user)
+
+    rule_ids = list(due.order_by('id').values_list('id', flat=True))
+    created = 0
+    for i in range(0, len(rule_ids), RULES_PER_CHUNK):
+        created += _materialize_chunk(rule_ids[i:i + RULES_PER_CHUNK], until)
+    return created
@@ -0,0 +1,54 @@
+import gzip
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+from .fastpath import PreEncodedJSON
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+# Bodies smaller than this aren't worth the CPU to compress
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _accepted_encodings(request):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '') if request else ''
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that passes pre-encoded fast-path bodies straight through and
+    negotiates brotli/gzip compression for large responses.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, PreEncodedJSON):
+            body = bytes(data)
+        else:
+            body = super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        response = renderer_context.get('response')
+        if response is None or len(body) < MIN_COMPRESS_SIZE or response.has_header('Content-Encoding'):
+            return body
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        accepted = _accepted_encodings(renderer_context.get('request'))
+        if brotli is not None and 'br' in accepted:
+            response['Content-Encoding'] = 'br'
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        if 'gzip' in accepted:
+            response['Content-Encoding'] = 'gzip'
+            return gzip.compress(body, compresslevel=GZIP_LEVEL)
+        return body
@@ -0,0 +1,94 @@
+import contextvars
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_ALIAS = 'replica'
+
+# Database alias reads are routed to for the current request (None = primary)
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def _pin_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def pin_to_primary(user):
+    """
+    Send this user's reads to the primary for REPLICA_STICKY_SECONDS so they
+    see their own writes despite replication lag. The pin lives in the
+    default cache, which settings.py points at a backend shared by all workers.
+    """
+    _read_alias.set(None)
+    if replica_configured() and user is not None and user.is_authenticated:
+        cache.set(_pin_key(user.pk), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user):
+    return cache.get(_pin_key(user.pk), False)
+
+
+class ReplicaRouter:
+    """Routes reads to the replica only where a view opted in; writes always go to default."""
+
+    def db_for_read(self, model, **hints):
+        # The database cache holds the pins themselves, so it always reads the primary
+        if model._meta.app_label == 'django_cache':
+            return 'default'
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+
+class ReplicaStickinessMiddleware:
+    """Scopes replica routing to one request and pins users after they write."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _read_alias.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+
+        # DRF copies the authenticated user back onto the Django request
+        user = getattr(request, 'user', None)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(user)
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    Serve read-only requests from the replica when one is configured and the
+    user has not written recently. ViewSets opt in per action.
+    """
+    replica_actions = ('list',)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not replica_configured() or request.method not in SAFE_METHODS:
+            return
+        action = getattr(self, 'action', None)
+        if action is not None and action not in self.replica_actions:
+            return
+        if is_pinned(request.user):
+            return
+        try:
+            connections[REPLICA_ALIAS].ensure_connection()
+        except DatabaseError:
+            # Replica down: fall back to the primary
+            return
+        _read_alias.set(REPLICA_ALIAS)
@@ -1,6 +1,10 @@
 from rest_framework import serializers
+from django.db.models import Sum
 from django.contrib.auth.models import User
-from .models import Income, Expense, Liability, Employee, SalaryPayment, Customer, CustomerPayment
+from .models import Income, Expense, Liability, Employee, SalaryPayment, Customer, CustomerPayment, Budget, RecurringTransaction, Job
+from .models import UserProfile, BankStatementLine, SalaryAllocation
+from .recurring import is_sub_daily, parse_rule
+from .jobs import check_payload, registered_tasks
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -18,14 +22,19 @@ class IncomeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Income
         fields = "__all__"
-        read_only_fields = ["user"]
+        read_only_fields = ["user", "recurring_rule", "reconciled_with"]
 
 
 class ExpenseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Expense
         fields = "__all__"
-        read_only_fields = ["user"]
+        read_only_fields = ["user", "recurring_rule", "reconciled_with"]
+
+    def validate_customer(self, value):
+        if value and value.user != self.context['request'].user:
+            raise serializers.ValidationError("Unknown customer.")
+        return value
 
 
 class LiabilitySerializer(serializers.ModelSerializer):
@@ -52,6 +61,38 @@ class SalaryPaymentSerializer(serializers.ModelSerializer):
         model = SalaryPayment
         fields = "__all__"
 
+
+class SalaryAllocationSerializer(serializers.ModelSerializer):
+    project_name = serializers.ReadOnlyField(source='customer.project_name')
+
+    class Meta:
+        model = SalaryAllocation
+        fields = "__all__"
+        read_only_fields = ["currency"]
+
+    def validate(self, attrs):
+        user = self.context['request'].user
+        payment = attrs.get('salary_payment', getattr(self.instance, 'salary_payment', None))
+        customer = attrs.get('customer', getattr(self.instance, 'customer', None))
+        amount = attrs.get('amount', getattr(self.instance, 'amount', None))
+        if payment.employee.user != user or customer.user != user:
+            raise serializers.ValidationError("Unknown salary payment or customer.")
+        if amount <= 0:
+            raise serializers.ValidationError({'amount': 'Amount must be greater than 0'})
+
+        allocated = payment.allocations.exclude(
+            pk=getattr(self.instance, 'pk', None)).aggregate(Sum('amount'))['amount__sum'] or 0
+        if allocated + amount > payment.amount:
+            raise serializers.ValidationError(
+                {'amount': f'Only {payment.amount - allocated} of this payment is left to allocate.'})
+        clash = payment.allocations.filter(customer=customer)
+        if self.instance:
+            clash = clash.exclude(pk=self.instance.pk)
+        if clash.exists():
+            raise serializers.ValidationError(
+                "This payment is already allocated to that project.")
+        return attrs
+
 # --- NEW: Payment Serializer ---
 
 
@@ -59,6 +100,8 @@ class CustomerPaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomerPayment
         fields = '__all__'
+        # Always the customer's currency
+        read_only_fields = ['currency']
 
 # --- UPDATED: Customer Serializer ---
 
@@ -73,6 +116,15 @@ class CustomerSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['user', 'created_at']
 
+    def validate_currency(self, value):
+        customer = self.instance
+        if customer is not None and value != customer.currency and (
+                customer.advance_amount or customer.advance_income_record_id
+                or customer.payments.exists()):
+            raise serializers.ValidationError(
+                "Currency can't change once an advance or payment has been recorded.")
+        return value
+
     def get_total_paid(self, obj):
         # Sum of advance + all partial payments
         payments_sum = sum(p.amount for p in obj.payments.all())
@@ -81,3 +133,110 @@ class CustomerSerializer(serializers.ModelSerializer):
     def get_remaining(self, obj):
         paid = self.get_total_paid(obj)
         return obj.total_amount - paid
+
+
+class UserProfileSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = ["base_currency"]
+
+
+class BudgetSerializer(serializers.ModelSerializer):
+    remaining_amount = serializers.ReadOnlyField()
+    utilization = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Budget
+        fields = "__all__"
+        read_only_fields = ["user", "spent", "period_start", "created_at"]
+
+    def validate(self, attrs):
+        # The user is not part of the payload, so check the unique constraint by hand
+        request = self.context.get('request')
+        category = attrs.get('category', getattr(self.instance, 'category', None))
+        period = attrs.get('period', getattr(self.instance, 'period', 'Monthly'))
+        clash = Budget.objects.filter(
+            user=request.user, category=category, period=period)
+        if self.instance:
+            clash = clash.exclude(pk=self.instance.pk)
+        if clash.exists():
+            raise serializers.ValidationError(
+                "A budget for this category and period already exists.")
+        return attrs
+
+
+class RecurringTransactionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RecurringTransaction
+        fields = "__all__"
+        read_only_fields = ["user", "next_occurrence", "created_at"]
+
+    def validate(self, attrs):
+        rule = attrs.get('rule', getattr(self.instance, 'rule', None))
+        start_date = attrs.get(
+            'start_date', getattr(self.instance, 'start_date', None))
+        try:
+            parse_rule(rule, start_date)
+        except (ValueError, TypeError):
+            raise serializers.ValidationError(
+                {'rule': 'Invalid recurrence rule, e.g. FREQ=MONTHLY;BYMONTHDAY=1'})
+        if is_sub_daily(rule):
+            raise serializers.ValidationError(
+                {'rule': 'Rules can repeat at most daily.'})
+
+        kind = attrs.get('kind', getattr(self.instance, 'kind', None))
+        category = attrs.get('category', getattr(self.instance, 'category', None))
+        if kind == 'expense' and not category:
+            raise serializers.ValidationError(
+                {'category': 'Expense rules need a category.'})
+        return attrs
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ["id", "kind", "payload", "status", "progress", "result", "error",
+                  "attempts", "max_attempts", "created_at", "finished_at"]
+        read_only_fields = ["status", "progress", "result", "error",
+                            "attempts", "max_attempts", "created_at", "finished_at"]
+
+    def validate_kind(self, value):
+        if value not in registered_tasks():
+            raise serializers.ValidationError(f"Unknown task: {value}")
+        return value
+
+    def validate(self, attrs):
+        try:
+            check_payload(attrs['kind'], attrs.get('payload', {}))
+        except ValueError as exc:
+            raise serializers.ValidationError({'payload': str(exc)})
+        return attrs
+
+
+class BankStatementLineSerializer(serializers.ModelSerializer):
+    matched_income = serializers.SerializerMethodField()
+    matched_expense = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BankStatementLine
+        fields = "__all__"
+        read_only_fields = ["user", "imported_at"]
+
+    def get_matched_income(self, obj):
+        income = getattr(obj, 'income', None)
+        return income.id if income else None
+
+    def get_matched_expense(self, obj):
+        expense = getattr(obj, 'expense', None)
+        return expense.id if expense else None
+
+    def validate_reference(self, value):
+        # Only checked for single lines; the CSV import skips known references itself
+        request = self.context.get('request')
+        if value and not isinstance(self.parent, serializers.ListSerializer):
+            clash = BankStatementLine.objects.filter(user=request.user, reference=value)
+            if self.instance:
+                clash = clash.exclude(pk=self.instance.pk)
+            if clash.exists():
+                raise serializers.ValidationError("This bank reference was already imported.")
+        return value
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .events import publish, publish_totals
+from .models import Income, Expense, Liability, SalaryPayment, CustomerPayment
+
+
+def _transaction_data(instance, kind):
+    title = instance.source if kind == 'income' else instance.category
+    return {'id': instance.id, 'title': title, 'amount': instance.amount,
+            'currency': instance.currency, 'date': instance.date, 'type': kind}
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Expense)
+def transaction_saved(sender, instance, created, **kwargs):
+    kind = 'income' if sender is Income else 'expense'
+    action = 'created' if created else 'updated'
+    publish(instance.user_id, f"transaction.{action}",
+            _transaction_data(instance, kind))
+    publish_totals(instance.user_id)
+
+
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Expense)
+def transaction_deleted(sender, instance, **kwargs):
+    kind = 'income' if sender is Income else 'expense'
+    publish(instance.user_id, 'transaction.deleted',
+            {'id': instance.id, 'type': kind})
+    publish_totals(instance.user_id)
+
+
+@receiver(post_save, sender=Liability)
+@receiver(post_delete, sender=Liability)
+def liability_changed(sender, instance, **kwargs):
+    publish_totals(instance.user_id)
+
+
+@receiver(post_save, sender=SalaryPayment)
+def salary_payment_saved(sender, instance, created, **kwargs):
+    if created:
+        publish(instance.employee.user_id, 'payroll.created', {
+            'id': instance.id, 'employee': instance.employee.name,
+            'amount': instance.amount, 'date': instance.payment_date})
+
+
+@receiver(post_save, sender=CustomerPayment)
+def customer_payment_saved(sender, instance, created, **kwargs):
+    if created:
+        publish(instance.customer.user_id, 'customer_payment.created', {
+            'id': instance.id, 'customer': instance.customer.name,
+            'amount': instance.amount, 'date': instance.date})
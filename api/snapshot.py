@@ -0,0 +1,285 @@
+import datetime
+import decimal
+import gzip
+import io
+import json
+import zlib
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, connections, router, transaction
+from .models import (
+    Income, Expense, Liability, Employee, SalaryPayment, Customer, CustomerPayment,
+    Budget, RecurringTransaction, ArchivedIncome, ArchivedExpense, LedgerSummary, LedgerClosure,
+    UserProfile, BankStatementLine, SalaryAllocation
+)
+from .archive import rebuild_summaries
+
+FORMAT = 'astrosoft-snapshot'
+VERSION = 2
+# Version 1 summarised archives by month; its summaries are rebuilt by day instead
+LEGACY_VERSIONS = (1,)
+BATCH_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+# (section, model, lookup to the owning user, {fk column: section it points at})
+# Sections are written and restored in this order so every FK target is
+# restored before the rows that reference it.
+SECTIONS = [
+    ('profile', UserProfile, 'user', {}),
+    ('recurring', RecurringTransaction, 'user', {}),
+    ('bank_line', BankStatementLine, 'user', {}),
+    ('income', Income, 'user', {'recurring_rule_id': 'recurring', 'reconciled_with_id': 'bank_line'}),
+    ('liability', Liability, 'user', {}),
+    ('employee', Employee, 'user', {}),
+    ('salary_payment', SalaryPayment, 'employee__user', {'employee_id': 'employee'}),
+    ('customer', Customer, 'user', {'advance_income_record_id': 'income'}),
+    ('customer_payment', CustomerPayment, 'customer__user',
+     {'customer_id': 'customer', 'income_record_id': 'income'}),
+    ('expense', Expense, 'user',
+     {'recurring_rule_id': 'recurring', 'reconciled_with_id': 'bank_line', 'customer_id': 'customer'}),
+    ('salary_allocation', SalaryAllocation, 'salary_payment__employee__user',
+     {'salary_payment_id': 'salary_payment', 'customer_id': 'customer'}),
+    ('budget', Budget, 'user', {}),
+    ('archived_income', ArchivedIncome, 'user',
+     {'recurring_rule_id': 'recurring', 'reconciled_with_id': 'bank_line'}),
+    ('archived_expense', ArchivedExpense, 'user',
+     {'recurring_rule_id': 'recurring', 'reconciled_with_id': 'bank_line', 'customer_id': 'customer'}),
+    ('ledger_summary', LedgerSummary, 'user', {}),
+    ('ledger_closure', LedgerClosure, 'user', {}),
+]
+SECTION_MAP = {name: (model, lookup, fks) for name, model, lookup, fks in SECTIONS}
+SECTION_ORDER = {name: i for i, (name, _, _, _) in enumerate(SECTIONS)}
+
+
+def _columns(model):
+    # The owner is implied by the snapshot, so user_id is never stored
+    return [f.attname for f in model._meta.concrete_fields if f.attname != 'user_id']
+
+
+def _encode(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def iter_lines(user):
+    yield json.dumps({'format': FORMAT, 'version': VERSION, 'user': user.username,
+                      'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat()})
+    counts = {}
+    for name, model, lookup, _ in SECTIONS:
+        columns = _columns(model)
+        yield json.dumps({'section': name, 'columns': columns})
+        rows = model.objects.filter(**{lookup: user}).order_by('pk').values_list(
+            *columns).iterator(chunk_size=BATCH_SIZE)
+        count = 0
+        for row in rows:
+            yield json.dumps(row, default=_encode, separators=(',', ':'))
+            count += 1
+        counts[name] = count
+    yield json.dumps({'end': True, 'counts': counts})
+
+
+def iter_snapshot(user):
+    """Yield the gzip-compressed snapshot of `user` in chunks, never holding it all in memory."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    buffer = []
+    size = 0
+    for line in iter_lines(user):
+        buffer.append(line)
+        size += len(line) + 1
+        if size >= FLUSH_BYTES:
+            chunk = compressor.compress(('\n'.join(buffer) + '\n').encode('utf-8'))
+            buffer, size = [], 0
+            if chunk:
+                yield chunk
+    if buffer:
+        yield compressor.compress(('\n'.join(buffer) + '\n').encode('utf-8'))
+    yield compressor.flush()
+
+
+def delete_user_data(user):
+    for _, model, lookup, _ in reversed(SECTIONS):
+        model.objects.filter(**{lookup: user}).delete()
+
+
+def has_user_data(user):
+    return any(model.objects.filter(**{lookup: user}).exists() for _, model, lookup, _ in SECTIONS)
+
+
+# Archive rows keep ids from the hot table's sequence (see models.py), so on
+# restore they are first inserted there to draw fresh ids, then moved.
+HOT_MODELS = {ArchivedIncome: Income, ArchivedExpense: Expense}
+
+
+def _bulk_insert(model, objects):
+    """
+    bulk_create `objects`, then put back any auto_now/auto_now_add values that
+    bulk_create overwrote, so timestamps survive the round trip.
+    """
+    using = router.db_for_write(model)
+    if model._meta.pk.auto_created and not connections[using].features.can_return_rows_from_bulk_insert:
+        raise ValueError("Restoring needs a database that returns ids from bulk inserts")
+    stamped = [f.attname for f in model._meta.concrete_fields
+               if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+    originals = [[getattr(obj, name) for name in stamped] for obj in objects]
+    model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+    if stamped:
+        for obj, values in zip(objects, originals):
+            for name, value in zip(stamped, values):
+                setattr(obj, name, value)
+        model.objects.bulk_update(objects, stamped, batch_size=BATCH_SIZE)
+
+
+def _hot_ids(archive_model, objects):
+    """Draw ids for archive rows from the matching hot table's sequence."""
+    hot_model = HOT_MODELS[archive_model]
+    # Nullable FKs are left out so the placeholders can't trip the hot
+    # table's unique constraints (reconciled_with, recurring occurrences)
+    columns = [f.attname for f in hot_model._meta.concrete_fields
+               if not f.primary_key and not (f.is_relation and f.null)]
+    placeholders = [hot_model(**{c: getattr(obj, c) for c in columns}) for obj in objects]
+    hot_model.objects.bulk_create(placeholders, batch_size=BATCH_SIZE)
+    ids = [row.pk for row in placeholders]
+    hot_model.objects.filter(pk__in=ids).delete()
+    return ids
+
+
+class _SectionRestorer:
+    def __init__(self, name, user, id_maps):
+        self.name = name
+        self.model, _, self.fks = SECTION_MAP[name]
+        self.user = user
+        self.id_maps = id_maps
+        self.id_maps.setdefault(name, {})
+        self.pending = []
+        self.count = 0
+        self.skip = False
+        self.has_user = any(f.attname == 'user_id' for f in self.model._meta.concrete_fields)
+        # FK columns that can't be NULL must point at a restored row
+        self.required = {f.attname for f in self.model._meta.concrete_fields
+                         if f.attname in self.fks and not f.null}
+
+    def set_columns(self, columns):
+        fields = {f.attname: f for f in self.model._meta.concrete_fields}
+        unknown = set(columns) - set(fields)
+        if unknown:
+            raise ValueError(f"Unknown columns for {self.name}: {sorted(unknown)}")
+        pk = self.model._meta.pk.attname
+        if pk not in columns:
+            raise ValueError(f"Section {self.name} has no {pk} column")
+        self.columns = columns
+        self.converters = [fields[c].to_python for c in columns]
+
+    def add(self, row):
+        if len(row) != len(self.columns):
+            raise ValueError(f"Row in {self.name} does not match its columns")
+        self.pending.append(row)
+        if len(self.pending) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        if self.skip:
+            self.count += len(self.pending)
+            self.pending = []
+            return
+        pk = self.model._meta.pk.attname
+        objects, old_ids = [], []
+        for row in self.pending:
+            try:
+                values = {c: convert(v) if v is not None else None
+                          for c, convert, v in zip(self.columns, self.converters, row)}
+            except ValidationError as exc:
+                raise ValueError(f"Invalid value in {self.name}: {exc.messages[0]}")
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value in {self.name}")
+            old_ids.append(values.pop(pk))
+            for column, target in self.fks.items():
+                if values.get(column) is not None:
+                    # Dangling references (e.g. to a deleted row) become NULL...
+                    values[column] = self.id_maps.get(target, {}).get(values[column])
+                if column in self.required and values.get(column) is None:
+                    # ...unless the column can't be NULL
+                    raise ValueError(f"{self.name} row {old_ids[-1]} references a missing {target}")
+            if self.has_user:
+                values['user_id'] = self.user.pk
+            objects.append(self.model(**values))
+
+        try:
+            if self.model in HOT_MODELS:
+                for obj, new_id in zip(objects, _hot_ids(self.model, objects)):
+                    obj.pk = new_id
+            _bulk_insert(self.model, objects)
+        except (IntegrityError, DataError) as exc:
+            # e.g. a missing required value or two rows for one unique key
+            raise ValueError(f"Rows in {self.name} can't be restored: {exc}")
+
+        mapping = self.id_maps[self.name]
+        for old_id, obj in zip(old_ids, objects):
+            mapping[old_id] = obj.pk
+        self.count += len(objects)
+        self.pending = []
+
+
+def restore_snapshot(user, fileobj, replace=False):
+    """
+    Restore a snapshot read from the binary file `fileobj` into `user`, in one
+    transaction. Rows are inserted with bulk_create in batches and every FK is
+    remapped to the newly assigned ids. Returns row counts per section.
+    """
+    lines = io.TextIOWrapper(gzip.GzipFile(fileobj=fileobj), encoding='utf-8')
+    header = json.loads(next(lines, 'null') or 'null')
+    if not isinstance(header, dict) or header.get('format') != FORMAT:
+        raise ValueError("Not a snapshot file")
+    if header.get('version') != VERSION and header.get('version') not in LEGACY_VERSIONS:
+        raise ValueError(f"Unsupported snapshot version {header.get('version')}")
+    legacy = header['version'] in LEGACY_VERSIONS
+
+    id_maps, counts = {}, {}
+    with transaction.atomic():
+        if replace:
+            delete_user_data(user)
+        elif has_user_data(user):
+            raise ValueError("User already has data; restore with replace to overwrite it")
+
+        section = None
+        expected = None
+        last_position = -1
+        for line in lines:
+            record = json.loads(line)
+            if isinstance(record, list):
+                if section is None:
+                    raise ValueError("Row outside of a section")
+                section.add(record)
+                continue
+            if not isinstance(record, dict):
+                raise ValueError("Expected a row or a section header")
+            if section is not None:
+                section.flush()
+                counts[section.name] = section.count
+            if record.get('end'):
+                expected = record.get('counts')
+                break
+            name, columns = record.get('section'), record.get('columns')
+            if not isinstance(name, str) or name not in SECTION_MAP:
+                raise ValueError(f"Unknown section {name}")
+            if not isinstance(columns, list) or not all(isinstance(c, str) for c in columns):
+                raise ValueError(f"Section {name} needs a list of column names")
+            # FK targets are only remapped if their section came first
+            position = SECTION_ORDER[name]
+            if position <= last_position:
+                raise ValueError(f"Section {name} is repeated or out of order")
+            last_position = position
+            section = _SectionRestorer(name, user, id_maps)
+            section.skip = legacy and section.model is LedgerSummary
+            section.set_columns(columns)
+
+        if expected is None:
+            raise ValueError("Snapshot is truncated")
+        if expected != counts:
+            raise ValueError("Snapshot row counts do not match its footer")
+        if legacy:
+            rebuild_summaries(user)
+    return counts
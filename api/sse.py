@@ -0,0 +1,104 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from .events import get_broker
+from .stats import ledger_totals
+
+EVENTS_PATH = '/api/events/'
+# Comment line sent on idle connections so proxies don't time them out
+HEARTBEAT_SECONDS = 25
+
+
+def _user_id(scope):
+    # EventSource can't send an Authorization header, so the access token
+    # comes in the query string
+    params = parse_qs(scope.get('query_string', b'').decode())
+    token = (params.get('token') or [None])[0]
+    if not token:
+        return None
+    try:
+        user_id = AccessToken(token)[jwt_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+    # The claim may be a string; publishers use the model's pk type
+    return get_user_model()._meta.pk.to_python(user_id)
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def _cors_headers(scope):
+    origin = dict(scope.get('headers', [])).get(b'origin', b'').decode()
+    if origin and origin in settings.CORS_ALLOWED_ORIGINS:
+        return [(b'access-control-allow-origin', origin.encode()), (b'vary', b'Origin')]
+    return []
+
+
+def _totals(user_id):
+    # Runs on a worker thread, which owns its own DB connection
+    try:
+        return ledger_totals(user_id)
+    finally:
+        close_old_connections()
+
+
+def _format(event):
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder)
+    return f"event: {event['type']}\ndata: {data}\n\n".encode()
+
+
+async def events_app(scope, receive, send):
+    """
+    Server-sent events for one user's dashboard. Pure ASGI: an idle
+    connection is a coroutine parked on a queue, no thread or DB connection.
+    """
+    user_id = _user_id(scope)
+    if user_id is None:
+        await send({'type': 'http.response.start', 'status': 401,
+                    'headers': [(b'content-type', b'text/plain')] + _cors_headers(scope)})
+        await send({'type': 'http.response.body', 'body': b'Invalid or missing token'})
+        return
+
+    broker = get_broker()
+    subscriber = broker.subscribe(user_id)
+    _, queue = subscriber
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ] + _cors_headers(scope)})
+        await send({'type': 'http.response.body', 'body': b'retry: 5000\n: connected\n\n', 'more_body': True})
+
+        while True:
+            next_event = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({next_event, disconnected}, timeout=HEARTBEAT_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                next_event.cancel()
+                return
+            if next_event in done:
+                event = next_event.result()
+                if event['type'] == 'totals' and event['data'] is None:
+                    # Off the loop's thread, and not serialised with other streams
+                    event = {'type': 'totals', 'data': await sync_to_async(
+                        _totals, thread_sensitive=False)(user_id)}
+                body = _format(event)
+            else:
+                next_event.cancel()
+                body = b': ping\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        broker.unsubscribe(user_id, subscriber)
+        disconnected.cancel()
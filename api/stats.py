@@ -0,0 +1,38 @@
+from decimal import Decimal
+from django.db.models import Count, F, Sum
+from .models import Income, Expense, Liability
+from .archive import archived_total
+from .currency import base_currency, converted_amount, round_money
+
+
+def _converted_total(model, user, currency):
+    # COUNT(expr) skips NULLs, so the difference is the rows with no FX rate
+    converted = converted_amount(currency)
+    totals = model.objects.filter(user=user).aggregate(
+        total=Sum(converted), rows=Count('id'), converted=Count(converted))
+    return round_money(totals['total']), totals['rows'] - totals['converted']
+
+
+def ledger_totals(user):
+    """Headline dashboard figures; shared by /api/stats/ and the live event stream."""
+    currency = base_currency(user)
+    # Converted to the user's base currency inside the aggregate, and closed
+    # fiscal years live in LedgerSummary, so add those totals back in
+    income, income_skipped = _converted_total(Income, user, currency)
+    expense, expense_skipped = _converted_total(Expense, user, currency)
+    archived_income, archived_income_skipped = archived_total(user, 'income', currency)
+    archived_expense, archived_expense_skipped = archived_total(user, 'expense', currency)
+    total_income = income + archived_income
+    total_expense = expense + archived_expense
+    total_liabilities = Liability.objects.filter(user=user, is_settled=False).aggregate(
+        total=Sum(F('total_amount') - F('paid_amount')))['total'] or Decimal(0)
+    return {
+        'currency': currency,
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'balance': total_income - total_expense,
+        'total_liabilities': total_liabilities,
+        # Transactions left out of the totals because no FX rate is loaded for them
+        'unconverted_count': (income_skipped + expense_skipped
+                              + archived_income_skipped + archived_expense_skipped),
+    }
@@ -0,0 +1,30 @@
+from .jobs import task, set_progress
+from .models import Budget
+from .budgets import reset_budget
+from .recurring import materialize_due
+from .archive import close_year as close_fiscal_year
+from .reconcile import DATE_WINDOW_DAYS, reconcile as reconcile_lines
+
+
+@task('materialize_recurring')
+def materialize_recurring(job):
+    return {'created': materialize_due(user=job.user)}
+
+
+@task('rebuild_budgets')
+def rebuild_budgets(job):
+    budgets = list(Budget.objects.filter(user=job.user))
+    for i, budget in enumerate(budgets, start=1):
+        reset_budget(budget)
+        set_progress(job, i * 100 / len(budgets))
+    return {'budgets': len(budgets)}
+
+
+@task('close_year')
+def close_year(job, year: int):
+    return close_fiscal_year(job.user, int(year))
+
+
+@task('reconcile')
+def reconcile(job, window: int = DATE_WINDOW_DAYS):
+    return reconcile_lines(job.user, int(window))
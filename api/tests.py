@@ -1,3 +1,497 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import re
+from decimal import Decimal
+from io import BytesIO, StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from unittest import skipUnless
+from rest_framework.test import APIClient
+from .jobs import STALE_AFTER, claim_next, requeue_stale, run_job, set_progress
+from .archive import close_year
+from .models import (
+    ArchivedExpense, BankStatementLine, Budget, Customer, CustomerPayment, Employee, Expense, FxRate, Income, Job, RecurringTransaction,
+    SalaryAllocation, SalaryPayment, UserProfile,
+)
+from .recurring import materialize_due
+from .replica import REPLICA_ALIAS, pin_to_primary, replica_configured
+from .snapshot import iter_lines
+from .stats import ledger_totals
 
-# Create your tests here.
+
+class StartupBudgetTest(SimpleTestCase):
+    def test_worker_cold_start_within_budget(self):
+        # Raises CommandError if too slow, too large, or numpy/pandas/openpyxl load eagerly
+        out = StringIO()
+        call_command('bench_startup', workers=1, stdout=out)
+        self.assertIn("within budget", out.getvalue())
+
+
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    client.default_format = 'json'
+    return client
+
+
+class BudgetCounterTest(TestCase):
+    def setUp(self):
+        self.today = datetime.date.today()
+        self.user = User.objects.create_user('spender')
+        self.client = api_client(self.user)
+        self.client.post('/api/budgets/', {'category': 'Food', 'limit': '1000'})
+        response = self.client.post('/api/expenses/', {
+            'category': 'Food', 'amount': '100', 'date': self.today.isoformat()})
+        self.expense = response.json()['id']
+
+    def spent(self):
+        return Budget.objects.get(user=self.user).spent
+
+    def test_create_adds_to_counter(self):
+        self.assertEqual(self.spent(), Decimal('100'))
+
+    def test_update_moves_amount(self):
+        self.client.patch(f'/api/expenses/{self.expense}/', {'amount': '250'})
+        self.assertEqual(self.spent(), Decimal('250'))
+        self.client.patch(f'/api/expenses/{self.expense}/', {'category': 'Transport'})
+        self.assertEqual(self.spent(), Decimal('0'))
+
+    def test_delete_reverses_amount(self):
+        self.client.delete(f'/api/expenses/{self.expense}/')
+        self.assertEqual(self.spent(), Decimal('0'))
+
+    def test_rollover_recounts_new_period(self):
+        # Pretend the counter was last reset a year ago, with a stale total
+        Budget.objects.filter(user=self.user).update(
+            period_start=self.today.replace(day=1) - datetime.timedelta(days=365), spent=Decimal('999'))
+        self.client.get('/api/budgets/')
+        self.assertEqual(self.spent(), Decimal('100'))
+
+
+class RecurringMaterializeTest(TestCase):
+    def setUp(self):
+        self.start = datetime.date.today().replace(day=1)
+        self.until = self.start + datetime.timedelta(days=2)
+        self.owner = User.objects.create_user('owner')
+        self.client = api_client(self.owner)
+        self.client.post('/api/budgets/', {'category': 'Food', 'limit': '10000'})
+        response = self.client.post('/api/recurring/', {
+            'kind': 'expense', 'title': 'Lunch', 'category': 'Food', 'amount': '100',
+            'rule': 'FREQ=DAILY', 'start_date': self.start.isoformat()})
+        self.rule = RecurringTransaction.objects.get(pk=response.json()['id'])
+
+    def spent(self):
+        return Budget.objects.get(user=self.owner).spent
+
+    def test_rerun_is_idempotent(self):
+        self.assertEqual(materialize_due(until=self.until), 3)
+        # A re-run over the same days, e.g. after a partial failure
+        RecurringTransaction.objects.filter(pk=self.rule.pk).update(next_occurrence=self.start)
+        self.assertEqual(materialize_due(until=self.until), 0)
+        self.assertEqual(Expense.objects.filter(recurring_rule=self.rule).count(), 3)
+        self.assertEqual(self.spent(), Decimal('300'))
+
+    def test_other_user_cannot_claim_rule_occurrence(self):
+        intruder = api_client(User.objects.create_user('intruder'))
+        response = intruder.post('/api/expenses/', {
+            'category': 'Food', 'amount': '500', 'date': self.start.isoformat(),
+            'recurring_rule': self.rule.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.json()['recurring_rule'])
+
+        self.assertEqual(materialize_due(until=self.until), 3)
+        self.assertEqual(Expense.objects.filter(user=self.owner, recurring_rule=self.rule).count(), 3)
+        self.assertEqual(self.spent(), Decimal('300'))
+
+    def test_sub_daily_rules_are_rejected(self):
+        response = self.client.post('/api/recurring/', {
+            'kind': 'expense', 'title': 'Coffee', 'category': 'Food', 'amount': '1',
+            'rule': 'FREQ=HOURLY', 'start_date': self.start.isoformat()})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('rule', response.json())
+
+    def test_sub_daily_rule_writes_one_row_per_day(self):
+        # A rule saved before sub-daily frequencies were rejected
+        self.rule.delete()
+        rule = RecurringTransaction.objects.create(
+            user=self.owner, kind='expense', title='Coffee', category='Food', amount=1,
+            rule='FREQ=HOURLY', start_date=self.start, next_occurrence=self.start)
+        self.assertEqual(materialize_due(until=self.until), 3)
+        self.assertEqual(Expense.objects.filter(recurring_rule=rule).count(), 3)
+        self.assertEqual(self.spent(), Decimal('3'))
+
+
+class JobSubmitTest(TestCase):
+    def setUp(self):
+        self.client = api_client(User.objects.create_user('submitter'))
+
+    def test_payload_is_checked_against_task_signature(self):
+        for payload in ({}, {'year': 2020, 'month': 1}, {'year': 'last'}):
+            response = self.client.post('/api/jobs/', {'kind': 'close_year', 'payload': payload})
+            self.assertEqual(response.status_code, 400, payload)
+            self.assertIn('payload', response.json())
+        self.assertFalse(Job.objects.exists())
+
+    def test_max_attempts_is_read_only(self):
+        response = self.client.post('/api/jobs/', {
+            'kind': 'materialize_recurring', 'max_attempts': 1000})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['max_attempts'], 3)
+
+    def test_rejected_job_fails_without_retrying(self):
+        year = datetime.date.today().year + 1
+        self.client.post('/api/jobs/', {'kind': 'close_year', 'payload': {'year': year}})
+        job = run_job(claim_next('test'))
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.attempts, 1)
+
+    def test_stale_jobs_are_requeued_until_out_of_attempts(self):
+        self.client.post('/api/jobs/', {'kind': 'materialize_recurring'})
+        job = claim_next('test')
+        later = timezone.now() + STALE_AFTER * 2
+        self.assertEqual(requeue_stale(now=later), 1)
+        for _ in range(2):
+            claim_next('test')
+            requeue_stale(now=later)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+
+    def test_progress_renews_lock(self):
+        self.client.post('/api/jobs/', {'kind': 'materialize_recurring'})
+        job = claim_next('test')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - STALE_AFTER * 2)
+        set_progress(job, 50)
+        self.assertEqual(requeue_stale(), 0)
+
+
+@skipUnless(replica_configured(), "set REPLICA_DATABASE_URL, e.g. sqlite:///replica.sqlite3")
+class ReplicaRoutingTest(TransactionTestCase):
+    # A transaction-wrapped TestCase would hold SQLite locks the mirror can't read through
+    databases = {'default', REPLICA_ALIAS} if replica_configured() else {'default'}
+
+    def setUp(self):
+        self.client = api_client(User.objects.create_user('reader'))
+
+    def replica_queries(self, path):
+        with CaptureQueriesContext(connections[REPLICA_ALIAS]) as queries:
+            self.assertEqual(self.client.get(path).status_code, 200)
+        return len(queries)
+
+    def test_list_reads_from_replica(self):
+        self.assertGreater(self.replica_queries('/api/liabilities/'), 0)
+
+    def test_write_pins_reads_to_primary(self):
+        self.client.post('/api/liabilities/', {'title': 'Loan', 'total_amount': '100'})
+        self.assertEqual(self.replica_queries('/api/liabilities/'), 0)
+
+    def test_writes_never_use_replica(self):
+        with CaptureQueriesContext(connections[REPLICA_ALIAS]) as queries:
+            self.client.post('/api/liabilities/', {'title': 'Loan', 'total_amount': '100'})
+        self.assertEqual(len(queries), 0)
+
+
+class ArchivedTotalsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('archivist')
+        UserProfile.objects.create(user=self.user, base_currency='LKR')
+        FxRate.objects.create(base='USD', quote='LKR', date=datetime.date(2021, 3, 1), rate=300)
+        FxRate.objects.create(base='USD', quote='LKR', date=datetime.date(2021, 3, 20), rate=320)
+        Income.objects.create(user=self.user, source='Invoice', amount=10, currency='USD',
+                              date=datetime.date(2021, 3, 5))
+        Income.objects.create(user=self.user, source='Sale', amount=500, currency='EUR',
+                              date=datetime.date(2021, 3, 6))
+
+    def test_closing_a_year_keeps_converted_totals(self):
+        before = ledger_totals(self.user)
+        close_year(self.user, 2021)
+        after = ledger_totals(self.user)
+        self.assertEqual(before['total_income'], Decimal('3000'))
+        self.assertEqual(after['total_income'], before['total_income'])
+        # No EUR rate: still reported as unconverted once archived
+        self.assertEqual(after['unconverted_count'], 1)
+
+
+class CustomerCurrencyTest(TestCase):
+    def setUp(self):
+        self.client = api_client(User.objects.create_user('seller'))
+
+    def create(self, **fields):
+        response = self.client.post('/api/customers/', {
+            'name': 'Acme', 'project_name': 'Site', 'total_amount': '1000', 'currency': 'USD', **fields})
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def test_currency_editable_before_money_is_recorded(self):
+        customer = self.create()
+        response = self.client.patch(f'/api/customers/{customer}/', {'currency': 'EUR'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_currency_locked_after_advance(self):
+        customer = self.create(advance_amount='100')
+        response = self.client.patch(f'/api/customers/{customer}/', {'currency': 'EUR'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('currency', response.json())
+
+
+class ArchiveUnionListTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('historian')
+        self.client = api_client(self.user)
+        for day in (datetime.date(2021, 6, 1), datetime.date(2022, 6, 1)):
+            Expense.objects.create(user=self.user, category='Food', amount=10, date=day)
+        close_year(self.user, 2021)
+        # The rows were written without the API, so nothing pinned the reads yet
+        pin_to_primary(self.user)
+
+    def dates(self, query=''):
+        response = self.client.get(f'/api/expenses/{query}')
+        self.assertEqual(response.status_code, 200)
+        return [row['date'] for row in response.json()]
+
+    def test_unfiltered_list_is_hot_only(self):
+        self.assertEqual(self.dates(), ['2022-06-01'])
+
+    def test_range_into_closed_year_includes_archive(self):
+        self.assertEqual(self.dates('?start_date=2021-01-01'), ['2022-06-01', '2021-06-01'])
+        self.assertEqual(self.dates('?start_date=2021-01-01&end_date=2021-12-31'), ['2021-06-01'])
+
+    def test_end_date_only_includes_archive(self):
+        self.assertEqual(self.dates('?end_date=2021-12-31'), ['2021-06-01'])
+        self.assertEqual(self.dates('?end_date=2022-12-31'), ['2022-06-01', '2021-06-01'])
+
+    def test_range_after_closure_skips_archive(self):
+        self.assertEqual(self.dates('?start_date=2022-01-01'), ['2022-06-01'])
+
+
+# The manifest only exists after collectstatic
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}})
+class AdminChangelistTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', password='x')
+        self.client.force_login(self.admin)
+
+    def test_filters_do_not_scan_for_distinct_values(self):
+        for path in ('income', 'expense', 'customer', 'bankstatementline', 'userprofile',
+                     'job', 'ledgersummary', 'fxrate'):
+            with CaptureQueriesContext(connections['default']) as queries:
+                response = self.client.get(f'/admin/api/{path}/?user_id={self.admin.pk}'
+                                           if path != 'fxrate' else '/admin/api/fxrate/')
+            self.assertEqual(response.status_code, 200, path)
+            # date_hierarchy's DISTINCT is limited to the user's rows by the user filter
+            self.assertFalse([q for q in queries if re.search(
+                r'DISTINCT "api_\w+"\."(currency|base_currency|kind|year|base|quote)"', q['sql'])], path)
+
+
+class ProfitabilityTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('founder')
+        self.client = api_client(self.user)
+        day = datetime.date(2024, 3, 1)
+        FxRate.objects.create(base='USD', quote='LKR', date=day, rate=300)
+        self.project = Customer.objects.create(
+            user=self.user, name='Acme', project_name='Site', currency='USD',
+            total_amount=1000, advance_amount=500)
+        Expense.objects.create(user=self.user, category='Other', amount=100, currency='USD',
+                               date=day, customer=self.project)
+        Expense.objects.create(user=self.user, category='Other', amount=3000, currency='LKR',
+                               date=day, customer=self.project)
+        employee = Employee.objects.create(user=self.user, name='Dev', role='Dev', base_salary=300)
+        payment = SalaryPayment.objects.create(employee=employee, amount=300, payment_date=day)
+        SalaryAllocation.objects.create(salary_payment=payment, customer=self.project,
+                                        amount=300, currency='LKR')
+
+    def project_row(self):
+        response = self.client.get('/api/customers/profitability/')
+        self.assertEqual(response.status_code, 200)
+        [row] = response.json()
+        return row
+
+    def test_costs_without_rate_are_reported(self):
+        row = self.project_row()
+        self.assertEqual(Decimal(str(row['cost'])), Decimal('100'))
+        self.assertEqual(row['unconverted_count'], 2)
+        self.assertIsNone(row['margin_percent'])
+
+    def test_converted_costs_give_margin(self):
+        FxRate.objects.create(base='LKR', quote='USD', date=datetime.date(2024, 3, 1),
+                              rate=Decimal('0.005'))
+        row = self.project_row()
+        self.assertEqual(Decimal(str(row['cost'])), Decimal('116.50'))
+        self.assertEqual(row['unconverted_count'], 0)
+        self.assertEqual(row['margin_percent'], 76.7)
+
+    def test_unknown_ordering_is_rejected(self):
+        response = self.client.get('/api/customers/profitability/?ordering=user')
+        self.assertEqual(response.status_code, 400)
+
+
+class ReconciliationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('bookkeeper')
+        self.client = api_client(self.user)
+        UserProfile.objects.create(user=self.user, base_currency='LKR')
+        self.income = Income.objects.create(user=self.user, source='Acme invoice', amount=500,
+                                            currency='LKR', date=datetime.date(2024, 3, 4))
+        self.expense = Expense.objects.create(user=self.user, category='Utilities', amount=120,
+                                              currency='LKR', date=datetime.date(2024, 3, 10))
+
+    def upload(self, text):
+        statement = BytesIO(text.encode('utf-8'))
+        statement.name = 'statement.csv'
+        return self.client.post('/api/bank-lines/import/', {'file': statement}, format='multipart')
+
+    def test_import_reconciles_and_skips_known_references(self):
+        statement = ('date,description,amount,reference\n'
+                     '2024-03-05,ACME INVOICE,500,R1\n'
+                     '2024-03-11,Electricity,-120,R2\n'
+                     '2024-03-12,Unknown,-45,R3\n')
+        response = self.upload(statement)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()['imported'], response.json()['matched']), (3, 2))
+        self.income.refresh_from_db()
+        self.assertEqual(self.income.reconciled_with.reference, 'R1')
+
+        response = self.upload(statement)
+        self.assertEqual((response.json()['imported'], response.json()['skipped']), (0, 3))
+
+        unmatched = self.client.get('/api/bank-lines/unmatched/').json()
+        self.assertEqual([line['reference'] for line in unmatched['bank_lines']], ['R3'])
+        self.assertEqual((unmatched['incomes'], unmatched['expenses']), ([], []))
+
+    def test_bad_statement_and_window_are_rejected(self):
+        self.assertEqual(self.upload('when,amount\n2024-03-05,1\n').status_code, 400)
+        response = self.client.post('/api/bank-lines/reconcile/', {'window': 90})
+        self.assertEqual(response.status_code, 400)
+
+    def test_manual_match_checks_amount_and_currency(self):
+        line = BankStatementLine.objects.create(
+            user=self.user, date=datetime.date(2024, 3, 20), amount=-120, currency='USD')
+        response = self.client.post(f'/api/bank-lines/{line.pk}/match/', {'expense': self.expense.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Currency', response.json()['error'])
+
+        BankStatementLine.objects.filter(pk=line.pk).update(currency='LKR')
+        response = self.client.post(f'/api/bank-lines/{line.pk}/match/', {'expense': 'x'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(f'/api/bank-lines/{line.pk}/match/', {'expense': self.expense.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['matched_expense'], self.expense.pk)
+
+
+class CheckLedgerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('auditor')
+        self.client = api_client(self.user)
+
+    def customer(self, name, advance='100'):
+        response = self.client.post('/api/customers/', {
+            'name': name, 'project_name': f'{name} site', 'total_amount': '1000',
+            'advance_amount': advance, 'currency': 'LKR'})
+        return Customer.objects.get(pk=response.json()['id'])
+
+    def pay(self, customer, amount='50'):
+        response = self.client.post('/api/customer-payments/', {
+            'customer': customer.pk, 'amount': amount, 'note': 'March'})
+        return CustomerPayment.objects.get(pk=response.json()['id'])
+
+    def check_ledger(self, *args):
+        out = StringIO()
+        call_command('check_ledger', *args, stdout=out)
+        return out.getvalue()
+
+    def test_repair_fixes_every_kind_of_drift(self):
+        missing_advance = self.customer('Alpha')
+        Income.objects.filter(pk=missing_advance.advance_income_record_id).delete()
+        wrong_advance = self.customer('Beta')
+        Income.objects.filter(pk=wrong_advance.advance_income_record_id).update(amount=1)
+        missing_income = self.pay(self.customer('Gamma', advance='0'))
+        Income.objects.filter(pk=missing_income.income_record_id).delete()
+        wrong_payment = self.pay(wrong_advance)
+        Income.objects.filter(pk=wrong_payment.income_record_id).update(amount=2)
+        orphan = self.pay(wrong_advance).income_record_id
+        CustomerPayment.objects.filter(income_record_id=orphan).delete()
+
+        self.assertIn('issues found', self.check_ledger())
+        self.check_ledger('--repair')
+        self.assertIn('Ledger links are consistent', self.check_ledger())
+        self.assertFalse(Income.objects.filter(pk=orphan).exists())
+        wrong_advance.refresh_from_db()
+        self.assertEqual(wrong_advance.advance_income_record.amount, Decimal('100'))
+
+    def test_hand_typed_income_needs_explicit_repair(self):
+        self.customer('Delta')
+        typed = Income.objects.create(user=self.user, source='Project Payment: tips',
+                                      amount=5, date=datetime.date.today())
+        self.assertIn('unlinked_project_income was not repaired', self.check_ledger('--repair'))
+        self.assertTrue(Income.objects.filter(pk=typed.pk).exists())
+
+        self.check_ledger('--check', 'unlinked_project_income', '--repair')
+        self.assertFalse(Income.objects.filter(pk=typed.pk).exists())
+
+
+class SnapshotRestoreTest(TestCase):
+    def setUp(self):
+        self.source = User.objects.create_user('source')
+        self.client = api_client(User.objects.create_user('target'))
+        api_client(self.source).post('/api/expenses/', {
+            'category': 'Food', 'amount': '25', 'date': '2024-01-10'})
+        expense = Expense.objects.get(user=self.source)
+        ArchivedExpense.objects.create(
+            id=expense.pk + 1, user=self.source, category='Food', amount=Decimal('40'),
+            date=datetime.date(2023, 1, 10), created_at=expense.created_at)
+
+    def restore(self, lines):
+        upload = BytesIO(gzip.compress(('\n'.join(lines) + '\n').encode('utf-8')))
+        upload.name = 'backup.snapshot.jsonl.gz'
+        return self.client.post('/api/snapshot/', {'file': upload}, format='multipart')
+
+    def test_round_trip_keeps_timestamps_and_hot_ids(self):
+        response = self.restore(list(iter_lines(self.source)))
+        self.assertEqual(response.status_code, 200)
+        hot = Expense.objects.get(user__username='target')
+        archived = ArchivedExpense.objects.get(user__username='target')
+        self.assertEqual(hot.created_at, Expense.objects.get(user=self.source).created_at)
+        # Archive ids come from the hot sequence, so they never clash in the union
+        self.assertNotEqual(archived.pk, hot.pk)
+        self.assertFalse(Expense.objects.filter(pk=archived.pk).exists())
+        self.assertGreater(archived.pk, ArchivedExpense.objects.get(user=self.source).pk)
+
+    def test_out_of_order_sections_are_rejected(self):
+        lines = list(iter_lines(self.source))
+        headers = [i for i, line in enumerate(lines) if '"section"' in line]
+        lines[headers[0]], lines[headers[1]] = lines[headers[1]], lines[headers[0]]
+        response = self.restore(lines)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('out of order', response.json()['error'])
+
+    def test_missing_required_fk_target_is_rejected(self):
+        header = next(iter_lines(self.source))
+        counts = {'salary_payment': 1}
+        response = self.restore([
+            header,
+            json.dumps({'section': 'salary_payment', 'columns': ['id', 'employee_id', 'amount', 'payment_date']}),
+            json.dumps([1, 99, '100.00', '2024-01-31']),
+            json.dumps({'end': True, 'counts': counts}),
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('missing employee', response.json()['error'])
+
+    def test_malformed_lines_are_rejected(self):
+        header = next(iter_lines(self.source))
+        for lines in (
+                [header, json.dumps('stray')],
+                [header, json.dumps({'section': 'income'})],
+                [header, json.dumps({'section': ['income'], 'columns': []})],
+                [header, json.dumps({'section': 'budget', 'columns': ['id', 'limit']}),
+                 json.dumps([1, None]), json.dumps({'end': True, 'counts': {'budget': 1}})],
+                [header, json.dumps({'section': 'budget', 'columns': ['id', 'period_start']}),
+                 json.dumps([1, 5]), json.dumps({'end': True, 'counts': {'budget': 1}})]):
+            response = self.restore(lines)
+            self.assertEqual(response.status_code, 400, lines[1:])
@@ -3,7 +3,9 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     UserViewSet, IncomeViewSet, ExpenseViewSet, LiabilityViewSet,
     DashboardStatsView, EmployeeViewSet, SalaryPaymentViewSet,
-    CustomerViewSet, CustomerPaymentViewSet
+    CustomerViewSet, CustomerPaymentViewSet, BudgetViewSet,
+    RecurringTransactionViewSet, JobViewSet, SnapshotView, ProfileView,
+    BankStatementLineViewSet, SalaryAllocationViewSet
 )
 
 router = DefaultRouter()
@@ -13,9 +15,16 @@ router.register(r'expenses', ExpenseViewSet, basename='expenses')
 router.register(r'liabilities', LiabilityViewSet, basename='liabilities')
 router.register(r'employees', EmployeeViewSet, basename='employees')
 router.register(r'payroll', SalaryPaymentViewSet, basename='payroll')
+router.register(r'salary-allocations', SalaryAllocationViewSet,
+                basename='salary-allocation')
 router.register(r'customers', CustomerViewSet, basename='customer')
 router.register(r'customer-payments', CustomerPaymentViewSet,
                 basename='customer-payment')
+router.register(r'budgets', BudgetViewSet, basename='budget')
+router.register(r'recurring', RecurringTransactionViewSet,
+                basename='recurring')
+router.register(r'jobs', JobViewSet, basename='job')
+router.register(r'bank-lines', BankStatementLineViewSet, basename='bank-line')
 
 urlpatterns = [
     # Router handles all the /api/income, /api/expenses, etc.
@@ -24,4 +33,6 @@ urlpatterns = [
     # This creates the link: /api/stats/
     # The frontend is specifically asking for "stats", so we must name it "stats"!
     path('stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('snapshot/', SnapshotView.as_view(), name='snapshot'),
+    path('profile/', ProfileView.as_view(), name='profile'),
 ]
@@ -1,8 +1,11 @@
 from urllib import request
 from django.shortcuts import render
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.contrib.auth.models import User
-from django.db.models import Sum
-from rest_framework import viewsets, permissions, status
+from django.db import transaction
+from django.db.models import Sum, F
+from rest_framework import viewsets, mixins, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
@@ -11,9 +14,27 @@ import datetime
 from .serializers import (
     UserSerializer, IncomeSerializer, ExpenseSerializer,
     LiabilitySerializer, EmployeeSerializer, SalaryPaymentSerializer,
-    CustomerSerializer, CustomerPaymentSerializer
+    CustomerSerializer, CustomerPaymentSerializer, BudgetSerializer,
+    RecurringTransactionSerializer, JobSerializer, UserProfileSerializer,
+    BankStatementLineSerializer, SalaryAllocationSerializer
+)
+from .models import Income, Expense, Liability, Employee, SalaryPayment, Customer, CustomerPayment, Budget, RecurringTransaction, Job
+from .models import ArchivedIncome, ArchivedExpense, UserProfile, BankStatementLine, SalaryAllocation
+from .budgets import record_expense, reset_budget, roll_over, budget_alerts
+from .recurring import materialize_due, next_occurrence
+from .fastpath import FastListMixin
+from .replica import ReplicaReadMixin, pin_to_primary
+from .planner import plan
+from .snapshot import iter_snapshot, restore_snapshot
+from .stats import ledger_totals
+from .currency import base_currency, converted_amount, round_money
+from .profitability import ORDERING, project_profitability
+from .reconcile import (
+    DATE_WINDOW_DAYS, parse_statement, reconcile, statement_span, unmatched_lines
+)
+from .archive import (
+    ArchiveUnionMixin, archived_category_totals, archived_monthly_totals, closed_through
 )
-from .models import Income, Expense, Liability, Employee, SalaryPayment, Customer, CustomerPayment
 from django_filters.rest_framework import DjangoFilterBackend
 
 # --- CRUD ViewSets ---
@@ -25,31 +46,68 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.AllowAny]
 
 
-class IncomeViewSet(viewsets.ModelViewSet):
+class IncomeViewSet(ReplicaReadMixin, ArchiveUnionMixin, FastListMixin, viewsets.ModelViewSet):
     serializer_class = IncomeSerializer
     permission_classes = [permissions.IsAuthenticated]
+    archive_model = ArchivedIncome
 
     def get_queryset(self):
         return Income.objects.filter(user=self.request.user).order_by('-date')
 
+    def list(self, request, *args, **kwargs):
+        # Catch up this user's recurring rules before showing the ledger
+        if materialize_due(user=request.user):
+            pin_to_primary(request.user)
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
+        serializer.validated_data.setdefault(
+            'currency', base_currency(self.request.user))
         serializer.save(user=self.request.user)
 
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(ReplicaReadMixin, ArchiveUnionMixin, FastListMixin, viewsets.ModelViewSet):
     serializer_class = ExpenseSerializer
     permission_classes = [permissions.IsAuthenticated]
+    archive_model = ArchivedExpense
 
     def get_queryset(self):
         return Expense.objects.filter(user=self.request.user).order_by('-date')
 
+    def list(self, request, *args, **kwargs):
+        if materialize_due(user=request.user):
+            pin_to_primary(request.user)
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.validated_data.setdefault(
+            'currency', base_currency(self.request.user))
+        with transaction.atomic():
+            expense = serializer.save(user=self.request.user)
+            record_expense(expense.user, expense.category,
+                           expense.date, expense.amount, expense.currency)
+
+    def perform_update(self, serializer):
+        old = serializer.instance
+        with transaction.atomic():
+            # Reverse the old values first; category, date or amount may all change
+            record_expense(old.user, old.category,
+                           old.date, -old.amount, old.currency)
+            expense = serializer.save()
+            record_expense(expense.user, expense.category,
+                           expense.date, expense.amount, expense.currency)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            record_expense(instance.user, instance.category,
+                           instance.date, -instance.amount, instance.currency)
+            instance.delete()
 
 
-class LiabilityViewSet(viewsets.ModelViewSet):
+class LiabilityViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = LiabilitySerializer
     permission_classes = [permissions.IsAuthenticated]
+    replica_actions = ('list', 'plan')
 
     def get_queryset(self):
         return Liability.objects.filter(user=self.request.user)
@@ -72,34 +130,73 @@ class LiabilityViewSet(viewsets.ModelViewSet):
         if amount > liability.remaining_amount:
             return Response({'error': 'Amount exceeds remaining debt'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Update Liability
-        liability.paid_amount += amount
-        if liability.remaining_amount <= Decimal('0.00'):
-            liability.is_settled = True
-        liability.save()
-
-        # Create Expense Record with 'Liability' Category
-        Expense.objects.create(
-            user=request.user,
-            category='Liability',
-            amount=amount,
-            date=request.data.get('date', datetime.date.today()),
-            description=f"Payment for {liability.title}"
-        )
+        with transaction.atomic():
+            # Update Liability
+            liability.paid_amount += amount
+            if liability.remaining_amount <= Decimal('0.00'):
+                liability.is_settled = True
+            liability.save()
+
+            # Create Expense Record with 'Liability' Category
+            expense = Expense.objects.create(
+                user=request.user,
+                category='Liability',
+                amount=amount,
+                currency=base_currency(request.user),
+                date=request.data.get('date', datetime.date.today()),
+                description=f"Payment for {liability.title}"
+            )
+            record_expense(request.user, 'Liability', expense.date, amount)
 
         return Response({'status': 'payment recorded', 'new_balance': liability.remaining_amount})
 
+    @action(detail=False, methods=['get'])
+    def plan(self, request):
+        """Compare avalanche and snowball payoff of all unsettled liabilities for a monthly budget."""
+        liabilities = list(self.get_queryset().filter(is_settled=False).annotate(
+            remaining=F('total_amount') - F('paid_amount')
+        ).filter(remaining__gt=0).values('id', 'title', 'remaining', 'interest_rate', 'minimum_payment'))
+
+        if not liabilities:
+            return Response({'error': 'No outstanding liabilities'}, status=status.HTTP_400_BAD_REQUEST)
+
+        minimum_total = sum(l['minimum_payment'] for l in liabilities)
+        try:
+            monthly_budget = Decimal(
+                str(request.query_params.get('monthly_budget', minimum_total)))
+            # NaN/Infinity parse fine but can't be compared or planned with
+            if not monthly_budget.is_finite():
+                raise ValueError(monthly_budget)
+        except:
+            return Response({'error': 'Invalid amount format'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if monthly_budget <= 0:
+            return Response({'error': 'Monthly budget must be greater than 0'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if monthly_budget < minimum_total:
+            return Response({'error': f'Monthly budget is below the total minimum payments ({minimum_total})'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        include_schedule = request.query_params.get('detail') in ('1', 'true')
+        return Response({
+            'monthly_budget': monthly_budget,
+            'strategies': plan(liabilities, float(monthly_budget), include_schedule),
+        })
+
 # --- NEW: Customer ViewSets ---
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = CustomerSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         return Customer.objects.filter(user=self.request.user).order_by('-created_at')
 
+    @transaction.atomic
     def perform_create(self, serializer):
+        serializer.validated_data.setdefault(
+            'currency', base_currency(self.request.user))
         customer = serializer.save(user=self.request.user)
 
         # 1. Create Income for Advance
@@ -108,6 +205,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
                 user=self.request.user,
                 source=f"Project Advance: {customer.project_name}",
                 amount=customer.advance_amount,
+                currency=customer.currency,
                 date=datetime.date.today(),
                 description=f"Initial Advance Payment for {customer.name}"
             )
@@ -115,6 +213,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
             customer.advance_income_record = income_entry
             customer.save()
 
+    @transaction.atomic
     def perform_destroy(self, instance):
         # 1. Delete the Linked Income Record (Advance)
         if instance.advance_income_record:
@@ -129,22 +228,35 @@ class CustomerViewSet(viewsets.ModelViewSet):
         # 3. Finally, delete the customer
         instance.delete()
 
+    @action(detail=False, methods=['get'])
+    def profitability(self, request):
+        """Revenue, cost, margin and outstanding balance per project, in its own currency."""
+        ordering = request.query_params.get('ordering', '-margin')
+        if ordering.lstrip('-') not in ORDERING:
+            return Response({'error': f'Order by one of: {", ".join(ORDERING)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(list(project_profitability(request.user, ordering)))
 
-class CustomerPaymentViewSet(viewsets.ModelViewSet):
+
+class CustomerPaymentViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = CustomerPaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         return CustomerPayment.objects.filter(customer__user=self.request.user).order_by('-date')
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        payment = serializer.save()
+        # Payments are always in the customer's currency
+        payment = serializer.save(
+            currency=serializer.validated_data['customer'].currency)
 
         # 1. Create Income
         income_entry = Income.objects.create(
             user=self.request.user,
             source=f"Project Payment: {payment.customer.project_name}",
             amount=payment.amount,
+            currency=payment.currency,
             date=payment.date,
             description=f"Partial Payment ({payment.note}) for {payment.customer.name}"
         )
@@ -153,6 +265,7 @@ class CustomerPaymentViewSet(viewsets.ModelViewSet):
         payment.income_record = income_entry
         payment.save()
 
+    @transaction.atomic
     def perform_destroy(self, instance):
         # 1. Delete the Linked Income Record
         if instance.income_record:
@@ -164,63 +277,70 @@ class CustomerPaymentViewSet(viewsets.ModelViewSet):
 # --- Dashboard Logic ---
 
 
-class DashboardStatsView(APIView):
+class DashboardStatsView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
         user = request.user
         today = datetime.date.today()
+        if materialize_due(user=user, until=today):
+            pin_to_primary(user)
 
-        total_income = Income.objects.filter(user=user).aggregate(Sum('amount'))[
-            'amount__sum'] or Decimal(0)
-        total_expense = Expense.objects.filter(user=user).aggregate(Sum('amount'))[
-            'amount__sum'] or Decimal(0)
-        liabilities = Liability.objects.filter(user=user)
-        total_liabilities = sum([l.remaining_amount for l in liabilities])
-        balance = total_income - total_expense
+        totals = ledger_totals(user)
+        # Every aggregate below is in the user's base currency, converted in SQL
+        currency = totals['currency']
+        converted = converted_amount(currency)
 
         recent_incomes = Income.objects.filter(user=user).values(
-            'id', 'source', 'amount', 'date', 'created_at')
+            'id', 'source', 'amount', 'currency', 'date', 'created_at')
         recent_expenses = Expense.objects.filter(user=user).values(
-            'id', 'category', 'amount', 'date', 'created_at')
+            'id', 'category', 'amount', 'currency', 'date', 'created_at')
 
         transactions = []
         for i in recent_incomes:
-            transactions.append({'id': i['id'], 'title': i['source'],
-                                'amount': i['amount'], 'date': i['date'], 'type': 'income'})
+            transactions.append({'id': i['id'], 'title': i['source'], 'amount': i['amount'],
+                                'currency': i['currency'], 'date': i['date'], 'type': 'income'})
         for e in recent_expenses:
-            transactions.append({'id': e['id'], 'title': e['category'],
-                                'amount': e['amount'], 'date': e['date'], 'type': 'expense'})
+            transactions.append({'id': e['id'], 'title': e['category'], 'amount': e['amount'],
+                                'currency': e['currency'], 'date': e['date'], 'type': 'expense'})
 
         transactions.sort(key=lambda x: x['date'], reverse=True)
         recent_transactions = transactions[:5]
 
-        category_stats = Expense.objects.filter(user=user).values(
-            'category').annotate(total=Sum('amount')).order_by('-total')
+        category_totals = archived_category_totals(user, currency)
+        for row in Expense.objects.filter(user=user).values('category').annotate(total=Sum(converted)):
+            category_totals[row['category']] = category_totals.get(
+                row['category'], 0) + round_money(row['total'])
+        category_stats = sorted(
+            ({'category': c, 'total': t} for c, t in category_totals.items()),
+            key=lambda x: x['total'], reverse=True)
+
+        first_month = (today.replace(day=1) -
+                       datetime.timedelta(days=5*30)).replace(day=1)
+        archived_months = archived_monthly_totals(user, first_month, currency)
 
         monthly_data = []
         for i in range(5, -1, -1):
             month_start = (today.replace(day=1) -
                            datetime.timedelta(days=i*30)).replace(day=1)
-            inc = Income.objects.filter(user=user, date__year=month_start.year, date__month=month_start.month).aggregate(
-                Sum('amount'))['amount__sum'] or 0
-            exp = Expense.objects.filter(user=user, date__year=month_start.year, date__month=month_start.month).aggregate(
-                Sum('amount'))['amount__sum'] or 0
+            inc = round_money(Income.objects.filter(user=user, date__year=month_start.year, date__month=month_start.month).aggregate(
+                total=Sum(converted))['total']) + archived_months.get(('income', month_start.year, month_start.month), 0)
+            exp = round_money(Expense.objects.filter(user=user, date__year=month_start.year, date__month=month_start.month).aggregate(
+                total=Sum(converted))['total']) + archived_months.get(('expense', month_start.year, month_start.month), 0)
             monthly_data.append({"name": month_start.strftime(
                 "%b"), "income": inc, "expense": exp})
 
         return Response({
-            "total_income": total_income,
-            "total_expense": total_expense,
-            "balance": balance,
-            "total_liabilities": total_liabilities,
+            **totals,
+            # Where the dashboard can stream /api/events/ from, if anywhere
+            "live_events": settings.LIVE_EVENTS_URL or None,
             "recent_transactions": recent_transactions,
             "category_stats": category_stats,
             "monthly_stats": monthly_data
         })
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = EmployeeSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -231,7 +351,7 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class SalaryPaymentViewSet(viewsets.ModelViewSet):
+class SalaryPaymentViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = SalaryPayment.objects.all()
     serializer_class = SalaryPaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -243,11 +363,288 @@ class SalaryPaymentViewSet(viewsets.ModelViewSet):
         return SalaryPayment.objects.filter(employee__user=self.request.user).order_by('-payment_date')
 
     def perform_create(self, serializer):
-        salary_payment = serializer.save()
-        Expense.objects.create(
-            user=self.request.user,
-            category='Salary',
-            amount=serializer.validated_data['amount'],
-            date=serializer.validated_data['payment_date'],
-            description=f"Salary Payment: {salary_payment.employee.name} ({serializer.validated_data['title']})"
-        )
+        with transaction.atomic():
+            salary_payment = serializer.save()
+            Expense.objects.create(
+                user=self.request.user,
+                category='Salary',
+                amount=serializer.validated_data['amount'],
+                currency=base_currency(self.request.user),
+                date=serializer.validated_data['payment_date'],
+                description=f"Salary Payment: {salary_payment.employee.name} ({serializer.validated_data['title']})"
+            )
+            record_expense(self.request.user, 'Salary',
+                           salary_payment.payment_date, salary_payment.amount)
+
+
+class SalaryAllocationViewSet(viewsets.ModelViewSet):
+    """Charge parts of salary payments to projects; see CustomerViewSet.profitability."""
+    serializer_class = SalaryAllocationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['salary_payment', 'customer']
+
+    def get_queryset(self):
+        return SalaryAllocation.objects.filter(
+            salary_payment__employee__user=self.request.user).select_related('customer')
+
+    def perform_create(self, serializer):
+        serializer.save(currency=base_currency(self.request.user))
+
+
+# --- Currencies ---
+
+
+class ProfileView(APIView):
+    """GET/PATCH the user's base currency, used for the dashboard and budgets."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        profile, _ = UserProfile.objects.get_or_create(user=request.user)
+        return Response(UserProfileSerializer(profile).data)
+
+    def patch(self, request):
+        profile, _ = UserProfile.objects.get_or_create(user=request.user)
+        serializer = UserProfileSerializer(profile, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+            # Budget counters are held in the base currency, so recount them
+            for budget in Budget.objects.filter(user=request.user):
+                reset_budget(budget)
+        return Response(serializer.data)
+
+
+# --- Budgets ---
+
+
+class BudgetViewSet(viewsets.ModelViewSet):
+    serializer_class = BudgetSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Budget.objects.filter(user=self.request.user).order_by('category', 'period')
+
+    def list(self, request, *args, **kwargs):
+        roll_over(self.get_queryset())
+        return super().list(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        reset_budget(serializer.save(user=self.request.user))
+
+    def perform_update(self, serializer):
+        reset_budget(serializer.save())
+
+    @action(detail=False, methods=['get'])
+    def alerts(self, request):
+        budgets = roll_over(list(self.get_queryset()))
+        return Response(budget_alerts(budgets))
+
+
+# --- Recurring Transactions ---
+
+
+class RecurringTransactionViewSet(viewsets.ModelViewSet):
+    serializer_class = RecurringTransactionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return RecurringTransaction.objects.filter(user=self.request.user).order_by('next_occurrence')
+
+    def perform_create(self, serializer):
+        serializer.validated_data.setdefault(
+            'currency', base_currency(self.request.user))
+        recurring = serializer.save(user=self.request.user)
+        # A rule starting inside a closed fiscal year begins after the closing date
+        recurring.next_occurrence = next_occurrence(
+            recurring, after=closed_through(recurring.user))
+        recurring.save(update_fields=['next_occurrence'])
+
+    def perform_update(self, serializer):
+        recurring = serializer.save()
+        # Resume after the last generated row so edits never duplicate past occurrences;
+        # closed fiscal years are never regenerated either
+        last = max(filter(None, [
+            recurring.incomes.order_by('-date').values_list('date', flat=True).first(),
+            recurring.expenses.order_by('-date').values_list('date', flat=True).first(),
+            closed_through(recurring.user),
+        ]), default=None)
+        recurring.next_occurrence = next_occurrence(recurring, after=last)
+        recurring.save(update_fields=['next_occurrence'])
+
+    @action(detail=False, methods=['post'])
+    def materialize(self, request):
+        created = materialize_due(user=request.user)
+        return Response({'created': created})
+
+
+# --- Background Jobs ---
+
+
+class JobViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """Submit heavy work to the queue and poll its status/progress/result."""
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user).order_by('-created_at')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        cancelled = Job.objects.filter(
+            pk=self.get_object().pk, status='queued').update(status='cancelled')
+        if not cancelled:
+            return Response({'error': 'Only queued jobs can be cancelled'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'status': 'cancelled'})
+
+
+# --- Snapshot / Restore ---
+
+
+class SnapshotView(APIView):
+    """GET downloads the user's data as a compressed snapshot; POST restores one."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        response = StreamingHttpResponse(
+            iter_snapshot(request.user), content_type='application/gzip')
+        filename = f"{request.user.username}-{datetime.date.today()}.snapshot.jsonl.gz"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload a snapshot as "file"'}, status=status.HTTP_400_BAD_REQUEST)
+
+        replace = str(request.data.get('replace', '')).lower() in ('1', 'true')
+        try:
+            counts = restore_snapshot(request.user, upload, replace=replace)
+        except (OSError, EOFError, ValueError) as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'status': 'restored', 'counts': counts})
+
+
+# --- Bank Reconciliation ---
+
+
+class BankStatementLineViewSet(viewsets.ModelViewSet):
+    serializer_class = BankStatementLineSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return BankStatementLine.objects.filter(user=self.request.user).select_related(
+            'income', 'expense').order_by('-date', '-id')
+
+    def perform_create(self, serializer):
+        serializer.validated_data.setdefault(
+            'currency', base_currency(self.request.user))
+        serializer.save(user=self.request.user)
+
+    def _window(self, request):
+        try:
+            window = int(request.data.get('window', request.query_params.get('window', DATE_WINDOW_DAYS)))
+        except (TypeError, ValueError):
+            window = -1
+        return window if 0 <= window <= 31 else None
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_statement(self, request):
+        """Import a CSV statement (date, amount or credit/debit, description, reference) and reconcile it."""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload a CSV statement as "file"'}, status=status.HTTP_400_BAD_REQUEST)
+        window = self._window(request)
+        if window is None:
+            return Response({'error': 'Window must be 0-31 days'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows = parse_statement(upload)
+        except (UnicodeDecodeError, ValueError) as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=rows, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        # Skip lines whose bank reference is already imported (or repeated in the file)
+        seen = set(BankStatementLine.objects.filter(user=request.user).exclude(
+            reference='').values_list('reference', flat=True))
+        currency = base_currency(request.user)
+        lines = []
+        for row in serializer.validated_data:
+            if row['reference']:
+                if row['reference'] in seen:
+                    continue
+                seen.add(row['reference'])
+            lines.append(BankStatementLine(
+                user=request.user, **{'currency': currency, **row}))
+
+        with transaction.atomic():
+            BankStatementLine.objects.bulk_create(lines, batch_size=1000)
+            result = reconcile(request.user, window)
+        return Response({'imported': len(lines), 'skipped': len(rows) - len(lines), **result},
+                        status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='reconcile')
+    def run_reconcile(self, request):
+        window = self._window(request)
+        if window is None:
+            return Response({'error': 'Window must be 0-31 days'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(reconcile(request.user, window))
+
+    @action(detail=False, methods=['get'])
+    def unmatched(self, request):
+        """Bank lines with no transaction, and transactions within the statements' dates with no line."""
+        first, last = statement_span(request.user)
+        if first is None:
+            return Response({'bank_lines': [], 'incomes': [], 'expenses': []})
+        lines = unmatched_lines(request.user).order_by('date', 'id')
+        incomes = Income.objects.filter(
+            user=request.user, reconciled_with__isnull=True, date__range=(first, last)).order_by('date')
+        expenses = Expense.objects.filter(
+            user=request.user, reconciled_with__isnull=True, date__range=(first, last)).order_by('date')
+        return Response({
+            'statement_start': first,
+            'statement_end': last,
+            'bank_lines': self.get_serializer(lines, many=True).data,
+            'incomes': IncomeSerializer(incomes, many=True).data,
+            'expenses': ExpenseSerializer(expenses, many=True).data,
+        })
+
+    @action(detail=True, methods=['post'])
+    def match(self, request, pk=None):
+        """Link this line to an income or expense by hand: {"income": id} or {"expense": id}."""
+        line = self.get_object()
+        kind = 'income' if 'income' in request.data else 'expense'
+        model = Income if kind == 'income' else Expense
+        try:
+            target = model.objects.filter(user=request.user, pk=request.data.get(kind)).first()
+        except (TypeError, ValueError):
+            target = None
+        if target is None:
+            return Response({'error': f'Unknown {kind}'}, status=status.HTTP_400_BAD_REQUEST)
+        if target.reconciled_with_id or not unmatched_lines(request.user).filter(pk=line.pk).exists():
+            return Response({'error': 'Already reconciled'}, status=status.HTTP_400_BAD_REQUEST)
+        if (line.amount > 0) != (kind == 'income') or abs(line.amount) != target.amount:
+            return Response({'error': 'Amount does not match this line'}, status=status.HTTP_400_BAD_REQUEST)
+        if line.currency != target.currency:
+            return Response({'error': 'Currency does not match this line'}, status=status.HTTP_400_BAD_REQUEST)
+        target.reconciled_with = line
+        target.save(update_fields=['reconciled_with'])
+        return Response(self.get_serializer(self.get_queryset().get(pk=line.pk)).data)
+
+    @action(detail=True, methods=['post'])
+    def unmatch(self, request, pk=None):
+        line = self.get_object()
+        Income.objects.filter(reconciled_with=line).update(reconciled_with=None)
+        Expense.objects.filter(reconciled_with=line).update(reconciled_with=None)
+        return Response(self.get_serializer(self.get_queryset().get(pk=line.pk)).data)
+
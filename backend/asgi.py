@@ -2,6 +2,11 @@
 ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+This is the `events` process: live dashboard events (/api/events/) are served
+here directly, without going through Django's request cycle, so idle streams
+stay cheap. The API itself runs on WSGI workers (see gunicorn.conf.py); other
+paths fall through to Django so a single ``uvicorn backend.asgi:application``
+also works in development.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -13,4 +18,12 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.sse import EVENTS_PATH, events_app  # noqa: E402  (needs Django set up)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        return await events_app(scope, receive, send)
+    return await django_application(scope, receive, send)
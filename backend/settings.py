@@ -54,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.replica.ReplicaStickinessMiddleware',   # Read-your-writes for the replica
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -87,6 +88,36 @@ DATABASES = {
     )
 }
 
+# Optional read replica for dashboards, list endpoints and reports.
+# Locally, two SQLite files work as a stand-in:
+#   REPLICA_DATABASE_URL=sqlite:///replica.sqlite3
+if os.environ.get('REPLICA_DATABASE_URL'):
+    DATABASES['replica'] = dj_database_url.config(
+        env='REPLICA_DATABASE_URL',
+        conn_max_age=600
+    )
+    # Tests run against a single database
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['api.replica.ReplicaRouter']
+
+# After a user writes, their reads stay on the primary for this many seconds
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+# Shared by every worker process, so a replica pin set by one is seen by all.
+# Uses Redis when REDIS_URL is set (needs the redis package), otherwise a
+# table in the primary database (created by: manage.py createcachetable).
+if os.environ.get('REDIS_URL'):
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }}
+else:
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -118,6 +149,12 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Currency used when a transaction or user doesn't specify one
+DEFAULT_CURRENCY = os.environ.get('DEFAULT_CURRENCY', 'LKR')
+
+# Month the fiscal year starts in (1 = January), used when closing years
+FISCAL_YEAR_START_MONTH = int(os.environ.get('FISCAL_YEAR_START_MONTH', 1))
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
@@ -157,6 +194,15 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 
+# Live dashboard events (see api/events.py) are streamed by the ASGI `events`
+# process, apart from the WSGI API workers. LIVE_EVENTS_URL is where browsers
+# reach it; leave it empty to turn live events off. With separate processes
+# the broker must cross them: use api.events.PostgresBroker. The in-process
+# default only works when one process serves both, e.g. uvicorn in development.
+LIVE_EVENTS_URL = os.environ.get('LIVE_EVENTS_URL', '').rstrip('/')
+LIVE_EVENTS_BROKER = os.environ.get('LIVE_EVENTS_BROKER', 'api.events.InProcessBroker')
+
+
 # REST FRAMEWORK CONFIG
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -164,7 +210,12 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    # Passes fast-path list bodies through and gzip/brotli-compresses large responses
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 SIMPLE_JWT = {
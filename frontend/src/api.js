@@ -1,7 +1,7 @@
 import axios from "axios";
 
 // Read the URL from the environment (Vercel), or default to localhost
-const API_URL = import.meta.env.VITE_API_URL || "http://127.0.0.1:8000";
+export const API_URL = import.meta.env.VITE_API_URL || "http://127.0.0.1:8000";
 
 const api = axios.create({
   baseURL: `${API_URL}/api/`, // Use the smart URL
@@ -166,8 +166,8 @@ const Customers = () => {
     }
   };
 
-  const formatCurrency = (val) =>
-    new Intl.NumberFormat("en-LK", { style: "currency", currency: "LKR" })
+  const formatCurrency = (val, currency = "LKR") =>
+    new Intl.NumberFormat("en-LK", { style: "currency", currency })
       .format(val)
       .replace("LKR", "Rs.");
 
@@ -314,10 +314,10 @@ const Customers = () => {
               <div className="mb-3 md:mb-4">
                 <div className="flex justify-between text-[10px] md:text-xs mb-1">
                   <span className="text-gray-400">
-                    Paid: {formatCurrency(client.total_paid)}
+                    Paid: {formatCurrency(client.total_paid, client.currency)}
                   </span>
                   <span className="text-gray-400">
-                    Total: {formatCurrency(client.total_amount)}
+                    Total: {formatCurrency(client.total_amount, client.currency)}
                   </span>
                 </div>
                 <div className="w-full bg-gray-800 rounded-full h-1.5 md:h-2">
@@ -341,7 +341,7 @@ const Customers = () => {
                   >
                     {client.remaining <= 0
                       ? "Fully Paid"
-                      : `Due: ${formatCurrency(client.remaining)}`}
+                      : `Due: ${formatCurrency(client.remaining, client.currency)}`}
                   </span>
                 </div>
               </div>
@@ -619,7 +619,7 @@ const Customers = () => {
                       </p>
                     </div>
                     <span className="font-mono font-bold text-green-400 text-xs md:text-sm">
-                      {formatCurrency(selectedCustomer.advance_amount)}
+                      {formatCurrency(selectedCustomer.advance_amount, selectedCustomer.currency)}
                     </span>
                   </div>
                 )}
@@ -637,7 +637,7 @@ const Customers = () => {
                       </p>
                     </div>
                     <span className="font-mono font-bold text-green-400 text-xs md:text-sm">
-                      {formatCurrency(pay.amount)}
+                      {formatCurrency(pay.amount, pay.currency)}
                     </span>
                   </div>
                 ))}
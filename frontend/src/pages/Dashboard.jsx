@@ -26,6 +26,39 @@ const Dashboard = () => {
     fetchStats();
   }, []);
 
+  // Live updates: the server pushes small events instead of us polling stats/
+  useEffect(() => {
+    const token = localStorage.getItem("access_token");
+    // The backend reports where, if anywhere, events are streamed from
+    if (!stats.live_events || !token || typeof EventSource === "undefined") return;
+
+    const source = new EventSource(
+      `${stats.live_events}/api/events/?token=${encodeURIComponent(token)}`
+    );
+
+    source.addEventListener("totals", (e) => {
+      const totals = JSON.parse(e.data);
+      setStats((prev) => ({ ...prev, ...totals }));
+    });
+
+    source.addEventListener("transaction.created", (e) => {
+      const t = JSON.parse(e.data);
+      setStats((prev) => ({
+        ...prev,
+        recent_transactions: [t, ...prev.recent_transactions]
+          .sort((a, b) => (a.date < b.date ? 1 : -1))
+          .slice(0, 5),
+      }));
+    });
+
+    // Edits, deletes or a dropped backlog: refetch everything once
+    ["transaction.updated", "transaction.deleted", "resync"].forEach((type) =>
+      source.addEventListener(type, () => fetchStats())
+    );
+
+    return () => source.close();
+  }, [stats.live_events]);
+
   const fetchStats = async () => {
     try {
       const response = await api.get("stats/");
@@ -35,10 +68,10 @@ const Dashboard = () => {
     }
   };
 
-  const formatCurrency = (amount) => {
+  const formatCurrency = (amount, currency = stats.currency || "LKR") => {
     return new Intl.NumberFormat("en-LK", {
       style: "currency",
-      currency: "LKR",
+      currency,
       minimumFractionDigits: 2,
     })
       .format(amount)
@@ -53,6 +86,12 @@ const Dashboard = () => {
         <p className="text-astro-text-muted mt-1 text-sm md:text-base">
           Financial summary and recent activity.
         </p>
+        {stats.unconverted_count > 0 && (
+          <p className="text-yellow-400 mt-2 text-sm">
+            {stats.unconverted_count} transaction(s) are left out of these
+            totals: no exchange rate to {stats.currency} is loaded for them.
+          </p>
+        )}
       </header>
 
       {/* --- Summary Cards Row --- */}
@@ -184,7 +223,7 @@ const Dashboard = () => {
                         : "text-red-500"
                     }`}
                   >
-                    {t.type === "income" ? "+" : "-"} {formatCurrency(t.amount)}
+                    {t.type === "income" ? "+" : "-"} {formatCurrency(t.amount, t.currency)}
                   </span>
                 </div>
               ))
@@ -66,10 +66,10 @@ const Expenses = () => {
     }
   };
 
-  const formatCurrency = (amount) => {
+  const formatCurrency = (amount, currency = "LKR") => {
     return new Intl.NumberFormat("en-LK", {
       style: "currency",
-      currency: "LKR",
+      currency,
       minimumFractionDigits: 2,
     })
       .format(amount)
@@ -224,7 +224,7 @@ const Expenses = () => {
 
                 <div className="flex items-center justify-between sm:justify-end gap-2 md:gap-6">
                   <span className="text-sm md:text-base lg:text-xl font-bold text-red-400 whitespace-nowrap">
-                    - {formatCurrency(expense.amount)}
+                    - {formatCurrency(expense.amount, expense.currency)}
                   </span>
                   <button
                     onClick={() => handleDelete(expense.id)}
@@ -55,10 +55,10 @@ const Income = () => {
     }
   };
 
-  const formatCurrency = (amount) => {
+  const formatCurrency = (amount, currency = "LKR") => {
     return new Intl.NumberFormat("en-LK", {
       style: "currency",
-      currency: "LKR",
+      currency,
       minimumFractionDigits: 2,
     })
       .format(amount)
@@ -206,7 +206,7 @@ const Income = () => {
 
                 <div className="flex items-center justify-between sm:justify-end gap-2 md:gap-6">
                   <span className="text-sm md:text-base lg:text-xl font-bold text-green-400 whitespace-nowrap">
-                    + {formatCurrency(income.amount)}
+                    + {formatCurrency(income.amount, income.currency)}
                   </span>
                   <button
                     onClick={() => handleDelete(income.id)}
@@ -0,0 +1,23 @@
+"""
+Gunicorn settings (picked up by the Procfile).
+
+With preload the app, URLconf and views are imported once in the master and
+shared copy-on-write by the forked workers, so scaling out doesn't pay the
+import cost per worker. Heavy libraries (numpy/pandas/openpyxl) are imported
+lazily by the modules that need them and are not part of this cost.
+Check it with: python manage.py bench_startup
+
+The API runs on sync WSGI workers. Live events (/api/events/) are served by
+the separate ASGI `events` process in the Procfile, see settings.py.
+"""
+import os
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+
+def when_ready(server):
+    if preload_app:
+        # Import the URLconf (and with it every view) before forking
+        from django.urls import get_resolver
+        get_resolver().url_patterns